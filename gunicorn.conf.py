@@ -0,0 +1,11 @@
+import os
+
+# Load Django + heavy modules once in the master; workers fork with them already imported.
+# Set GUNICORN_PRELOAD=False to load the app in each worker instead.
+preload_app = os.getenv("GUNICORN_PRELOAD", "True") == "True"
+
+
+def post_worker_init(worker):
+    from main_app.startup import warm_worker
+
+    warm_worker()
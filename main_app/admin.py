@@ -1,3 +1,15 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import AnswerKey, AnswerKeyItem
+
+
+class AnswerKeyItemInline(admin.TabularInline):
+    model = AnswerKeyItem
+    extra = 0
+
+
+@admin.register(AnswerKey)
+class AnswerKeyAdmin(admin.ModelAdmin):
+    list_display = ("subject", "grade", "updated_at")
+    list_filter = ("subject", "grade")
+    inlines = [AnswerKeyItemInline]
@@ -1,13 +1,16 @@
 import os
 import re
 import threading
+import time
 import openpyxl
+import requests
 from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
 
+from main_app.services import workbook_journal
 from main_app.services.graph_upload_session import GraphUploadSessionClient
+from main_app.services.workbook_cache import get_workbook_cache
 
-EXCEL_DIR = os.path.join(os.getcwd(), "excel_files")
-os.makedirs(EXCEL_DIR, exist_ok=True)
+EXCEL_DIR = os.path.join(os.getcwd(), "excel_files")  # created on first save, not at import
 
 # Lock per school to avoid concurrent local save/upload for same workbook
 _SCHOOL_LOCKS: dict[str, threading.Lock] = {}
@@ -38,42 +41,57 @@ def _get_lock_for_school(safe_school: str) -> threading.Lock:
     return _SCHOOL_LOCKS[safe_school]
 
 
-def save_to_excel(data: dict):
-    school_name = data.get("school_name", "UnknownSchool")
-    subject_raw = data.get("subject", "UnknownSubject")
-    subject = safe_sheet_name(subject_raw)
+def _load_or_download_workbook(client, remote_folder: str, remote_filename: str, file_path: str):
+    # ✅ After deploy or after cleanup, local file may not exist.
+    # Download the existing OneDrive workbook first to avoid overwriting history.
+    if not os.path.exists(file_path):
+        try:
+            downloaded = client.download_file(remote_folder, remote_filename, file_path)
+            if downloaded:
+                print("[OneDrive] Downloaded existing workbook before updating.")
+            else:
+                print("[OneDrive] Workbook not found on OneDrive yet. Will create a new one locally.")
+        except Exception as e:
+            print(f"[OneDrive Download Error] {e}")
+            # continue; we may create a new workbook locally if download fails
 
-    safe_school = safe_name(school_name)
+    # Load or create workbook
+    if os.path.exists(file_path):
+        return openpyxl.load_workbook(file_path)
+    return _new_workbook()
 
-    remote_folder = safe_school
-    remote_filename = f"{safe_school}.xlsx"
-    file_path = os.path.join(EXCEL_DIR, remote_filename)
 
-    lock = _get_lock_for_school(safe_school)
+def _new_workbook():
+    wb = openpyxl.Workbook()
+    default_sheet = wb.active
+    wb.remove(default_sheet)
+    return wb
 
-    with lock:
-        client = GraphUploadSessionClient()
 
-        # ✅ After deploy or after cleanup, local file may not exist.
-        # Download the existing OneDrive workbook first to avoid overwriting history.
-        if not os.path.exists(file_path):
-            try:
-                downloaded = client.download_file(remote_folder, remote_filename, file_path)
-                if downloaded:
-                    print("[OneDrive] Downloaded existing workbook before updating.")
-                else:
-                    print("[OneDrive] Workbook not found on OneDrive yet. Will create a new one locally.")
-            except Exception as e:
-                print(f"[OneDrive Download Error] {e}")
-                # continue; we may create a new workbook locally if download fails
-
-        # Load or create workbook
-        if os.path.exists(file_path):
-            wb = openpyxl.load_workbook(file_path)
-        else:
-            wb = openpyxl.Workbook()
-            default_sheet = wb.active
-            wb.remove(default_sheet)
+def _reload_workbook(client, remote_folder: str, remote_filename: str, file_path: str):
+    """
+    Fresh copy of the OneDrive workbook for re-applying pending rows before a replace
+    upload. Unlike _load_or_download_workbook, a failed download raises instead of
+    falling back to an empty workbook (which would then overwrite the remote history).
+    Only a missing file (404) gives an empty workbook.
+    """
+    # A local file left by a failed upload holds the stale version
+    if os.path.exists(file_path):
+        os.remove(file_path)
+    if client.download_file(remote_folder, remote_filename, file_path):
+        return openpyxl.load_workbook(file_path)
+    return _new_workbook()
+
+
+class RemoteWorkbookChanged(Exception):
+    """The OneDrive workbook no longer has the eTag the upload was based on (412)."""
+
+
+def _append_submissions(wb, rows: list[dict]):
+    touched = {}
+
+    for data in rows:
+        subject = safe_sheet_name(data.get("subject", "UnknownSubject"))
 
         # Load or create sheet
         if subject in wb.sheetnames:
@@ -111,68 +129,292 @@ def save_to_excel(data: dict):
         ]
         question_values = [ans.get("answer_value") for ans in data.get("answers", [])]
         ws.append(row + question_values)
+        touched[subject] = ws
 
-        # Borders + zebra
-        thin_border = Border(
-            left=Side(style="thin"),
-            right=Side(style="thin"),
-            top=Side(style="thin"),
-            bottom=Side(style="thin"),
-        )
+    # Style each touched sheet once, however many rows were appended
+    for ws in touched.values():
+        _style_sheet(ws)
 
-        for idx, row_cells in enumerate(ws.iter_rows(), 1):
-            if idx != 1:
-                fill_color = "DCE6F1" if idx % 2 == 0 else "FFFFFF"
-            else:
-                fill_color = None
 
-            for cell in row_cells:
-                cell.border = thin_border
-                cell.alignment = Alignment(horizontal="center", vertical="center")
-                if fill_color:
-                    cell.fill = PatternFill(start_color=fill_color, end_color=fill_color, fill_type="solid")
+def _style_sheet(ws):
+    # Borders + zebra
+    thin_border = Border(
+        left=Side(style="thin"),
+        right=Side(style="thin"),
+        top=Side(style="thin"),
+        bottom=Side(style="thin"),
+    )
 
-        # Column widths
-        for col in ws.columns:
-            ws.column_dimensions[col[0].column_letter].width = 25
+    for idx, row_cells in enumerate(ws.iter_rows(), 1):
+        if idx != 1:
+            fill_color = "DCE6F1" if idx % 2 == 0 else "FFFFFF"
+        else:
+            fill_color = None
 
-        # Save once
-        wb.save(file_path)
+        for cell in row_cells:
+            cell.border = thin_border
+            cell.alignment = Alignment(horizontal="center", vertical="center")
+            if fill_color:
+                cell.fill = PatternFill(start_color=fill_color, end_color=fill_color, fill_type="solid")
 
-        # Ensure file flushed to disk before upload
-        try:
-            with open(file_path, "rb") as f:
-                os.fsync(f.fileno())
-        except Exception:
-            pass
+    # Column widths
+    for col in ws.columns:
+        ws.column_dimensions[col[0].column_letter].width = 25
 
-        # Upload to OneDrive (replace)
+
+def _save_and_upload(client, wb, remote_folder: str, remote_filename: str, file_path: str,
+                     if_match: str | None = None) -> dict | None:
+    """
+    Save workbook locally and upload it to OneDrive (replace).
+    Returns the uploaded driveItem (contains eTag) or None if the upload did not happen.
+    With if_match, raises RemoteWorkbookChanged if OneDrive has another version.
+    """
+    # Save once
+    os.makedirs(EXCEL_DIR, exist_ok=True)
+    wb.save(file_path)
+
+    # Ensure file flushed to disk before upload
+    try:
+        with open(file_path, "rb") as f:
+            os.fsync(f.fileno())
+    except Exception:
+        pass
+
+    # Upload to OneDrive (replace)
+    try:
+        item = client.upload_large_file(
+            local_path=file_path,
+            remote_folder=remote_folder,
+            remote_filename=remote_filename,
+            chunk_size_mb=10,
+            max_retries=1,
+            if_match=if_match,
+        )
+
+        print("[OneDrive Upload] Success. Cleaning local file...")
+
+        # ✅ Delete local file after successful upload
         try:
-            client.upload_large_file(
-                local_path=file_path,
-                remote_folder=remote_folder,
-                remote_filename=remote_filename,
-                chunk_size_mb=10,
-                max_retries=1
-            )
+            os.remove(file_path)
+            print(f"[CLEANUP] Local file deleted: {file_path}")
+        except Exception as e:
+            print(f"[CLEANUP WARNING] Could not delete local file: {e}")
+
+        return item
+
+    except Exception as e:
+        msg = str(e)
+
+        if isinstance(e, requests.HTTPError) and getattr(e.response, "status_code", None) == 412:
+            raise RemoteWorkbookChanged(msg) from e
+
+        # If locked, skip upload and keep local file for next attempt
+        if "423" in msg or "Locked" in msg:
+            print("[OneDrive Upload] Skipped (Locked). Will upload on next submission.")
+        else:
+            print(f"[OneDrive Upload Error] {e}")
+        return None
+
+
+def _school_paths(safe_school: str) -> tuple[str, str, str]:
+    remote_folder = safe_school
+    remote_filename = f"{safe_school}.xlsx"
+    file_path = os.path.join(EXCEL_DIR, remote_filename)
+    return remote_folder, remote_filename, file_path
+
 
-            print("[OneDrive Upload] Success. Cleaning local file...")
+def _flush_entry(client, cache, entry, safe_school: str):
+    """
+    Upload a dirty cached workbook (caller holds the school lock).
 
-            # ✅ Delete local file after successful upload
+    The upload replaces the remote file, so it is conditional on the eTag this
+    workbook was based on (If-Match). If OneDrive has another version (edited there,
+    or rows uploaded by another worker), reload it and re-apply only our pending rows.
+    On failure the entry stays dirty and a retry is scheduled after the interval.
+    """
+    remote_folder, remote_filename, file_path = _school_paths(safe_school)
+
+    try:
+        remote_etag = client.get_item_etag(remote_folder, remote_filename)
+        # Second round: the remote file changed between the eTag check and the upload
+        for _ in range(2):
+            if remote_etag != entry.etag:
+                print(f"[WorkbookCache] Remote workbook changed, re-applying {len(entry.pending_rows)} rows: {safe_school}")
+                wb = _reload_workbook(client, remote_folder, remote_filename, file_path)
+                _append_submissions(wb, entry.pending_rows)
+                entry.workbook = wb
+                entry.etag = remote_etag
+                cache.resize(safe_school)
             try:
-                os.remove(file_path)
-                print(f"[CLEANUP] Local file deleted: {file_path}")
-            except Exception as e:
-                print(f"[CLEANUP WARNING] Could not delete local file: {e}")
+                item = _save_and_upload(
+                    client, entry.workbook, remote_folder, remote_filename, file_path, if_match=entry.etag
+                )
+                break
+            except RemoteWorkbookChanged:
+                remote_etag = client.get_item_etag(remote_folder, remote_filename)
+        else:
+            item = None
+    except Exception as e:
+        print(f"[WorkbookCache] Could not reconcile with OneDrive, postponing upload: {e}")
+        item = None
+
+    if item is not None:
+        cache.mark_flushed(entry, etag=item.get("eTag"))
+        workbook_journal.clear(safe_school)
+    else:
+        # Upload failed (e.g. Locked): keep rows resident + journaled and retry after the interval
+        entry.last_flush = time.monotonic()
+        cache.mark_dirty(entry)
+
+
+def _flush_cached_school(safe_school: str):
+    """
+    Debounced save callback: write out a cached workbook if it still has pending rows.
+    """
+    cache = get_workbook_cache()
+    lock = _get_lock_for_school(safe_school)
+
+    with lock:
+        entry = cache.get(safe_school) if cache is not None else None
+        if entry is None or not entry.dirty:
+            return
 
+        _flush_entry(GraphUploadSessionClient(), cache, entry, safe_school)
+
+
+def _save_to_excel_cached(cache, rows: list[dict], safe_school: str):
+    """
+    Cached variant of save_to_excel (caller holds the school lock).
+    """
+    remote_folder, remote_filename, file_path = _school_paths(safe_school)
+    client = GraphUploadSessionClient()
+
+    entry = cache.get(safe_school)
+
+    # Drop a clean cached copy if OneDrive has a newer version (edited elsewhere).
+    # Dirty copies are kept: they hold rows that are not uploaded yet.
+    if entry is not None and not entry.dirty:
+        try:
+            remote_etag = client.get_item_etag(remote_folder, remote_filename)
         except Exception as e:
-            msg = str(e)
+            print(f"[WorkbookCache] eTag check failed, using cached workbook: {e}")
+            remote_etag = entry.etag
+        if remote_etag != entry.etag:
+            print(f"[WorkbookCache] Remote workbook changed, reloading: {safe_school}")
+            cache.discard(safe_school)
+            entry = None
+
+    if entry is None:
+        entry = _load_cached_entry(client, cache, safe_school)
+
+    # Journal first: rows only in memory would be lost if the worker is killed
+    workbook_journal.append_rows(safe_school, rows)
+    _append_submissions(entry.workbook, rows)
+    entry.pending_rows.extend(rows)
+    cache.resize(safe_school)
+
+    if cache.mark_dirty(entry):
+        _flush_entry(client, cache, entry, safe_school)
 
-            # If locked, skip upload and keep local file for next attempt
-            if "423" in msg or "Locked" in msg:
-                print("[OneDrive Upload] Skipped (Locked). Will upload on next submission.")
+
+def _load_cached_entry(client, cache, safe_school: str):
+    """
+    Load a school's workbook into the cache, re-applying rows journaled by a
+    process that died before uploading them (caller holds the school lock).
+    """
+    remote_folder, remote_filename, file_path = _school_paths(safe_school)
+    recovered = workbook_journal.recover_rows(safe_school)
+    if recovered:
+        # These rows must land on top of the current remote version, never on an empty one
+        wb = _reload_workbook(client, remote_folder, remote_filename, file_path)
+    else:
+        wb = _load_or_download_workbook(client, remote_folder, remote_filename, file_path)
+    try:
+        etag = client.get_item_etag(remote_folder, remote_filename)
+    except Exception:
+        etag = None
+    entry = cache.put(safe_school, wb, etag=etag)
+
+    if recovered:
+        print(f"[WorkbookJournal] Re-applying {len(recovered)} journaled rows: {safe_school}")
+        _append_submissions(wb, recovered)
+        entry.pending_rows.extend(recovered)
+        cache.resize(safe_school)
+        cache.mark_dirty(entry)
+    return entry
+
+
+def recover_journaled_workbooks() -> int:
+    """
+    Load (and schedule the upload of) workbooks with rows journaled by dead processes.
+    Returns the number of schools recovered.
+    """
+    cache = get_workbook_cache(on_due=_flush_cached_school)
+    if cache is None:
+        return 0
+
+    recovered = 0
+    client = None
+    for safe_school in workbook_journal.orphaned_keys():
+        with _get_lock_for_school(safe_school):
+            if cache.get(safe_school) is not None:
+                continue  # recovered by a submission in the meantime
+            client = client or GraphUploadSessionClient()
+            entry = _load_cached_entry(client, cache, safe_school)
+            if entry.dirty and cache.mark_dirty(entry):
+                _flush_entry(client, cache, entry, safe_school)
+            recovered += 1
+    return recovered
+
+
+def prewarm_workbook(school_name: str) -> bool:
+    """
+    Load a school's workbook into the workbook cache ahead of its first submission.
+    Returns False when the cache is disabled or the workbook is already resident.
+    """
+    cache = get_workbook_cache(on_due=_flush_cached_school)
+    if cache is None:
+        return False
+
+    safe_school = safe_name(school_name)
+
+    with _get_lock_for_school(safe_school):
+        if cache.get(safe_school) is not None:
+            return False
+        _load_cached_entry(GraphUploadSessionClient(), cache, safe_school)
+    return True
+
+
+def save_to_excel(data: dict):
+    return save_batch_to_excel([data])[0]
+
+
+def save_batch_to_excel(rows: list[dict]) -> list[str]:
+    """
+    Append many submissions; each school's workbook is loaded, saved and uploaded once.
+    Returns the local workbook path per school (in first-seen order).
+    """
+    by_school: dict[str, list[dict]] = {}
+    for data in rows:
+        safe_school = safe_name(data.get("school_name", "UnknownSchool"))
+        by_school.setdefault(safe_school, []).append(data)
+
+    cache = get_workbook_cache(on_due=_flush_cached_school)
+    paths = []
+
+    for safe_school, school_rows in by_school.items():
+        remote_folder, remote_filename, file_path = _school_paths(safe_school)
+
+        with _get_lock_for_school(safe_school):
+            if cache is not None:
+                _save_to_excel_cached(cache, school_rows, safe_school)
             else:
-                print(f"[OneDrive Upload Error] {e}")
+                client = GraphUploadSessionClient()
+                wb = _load_or_download_workbook(client, remote_folder, remote_filename, file_path)
+                _append_submissions(wb, school_rows)
+                _save_and_upload(client, wb, remote_folder, remote_filename, file_path)
+
+        # NOTE: file may be deleted if upload succeeded
+        paths.append(file_path)
 
-    # NOTE: file may be deleted if upload succeeded
-    return file_path
+    return paths
@@ -0,0 +1,49 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from main_app.models import TrainingRecord
+from main_app.services.archive import archive_batch, vacuum_live_tables
+
+
+class Command(BaseCommand):
+    help = "Move training records of closed terms (created before a date) into the archive tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--before", required=True, help="YYYY-MM-DD: archive records created before this day")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Records moved per transaction")
+        parser.add_argument("--dry-run", action="store_true", help="Only count what would be moved")
+        parser.add_argument("--vacuum", action="store_true", help="VACUUM ANALYZE live tables afterwards (PostgreSQL)")
+
+    def handle(self, *args, **options):
+        try:
+            day = datetime.date.fromisoformat(options["before"])
+        except ValueError:
+            raise CommandError("--before must be YYYY-MM-DD")
+        cutoff = timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+        pending = TrainingRecord.objects.filter(created_at__lt=cutoff).count()
+        if options["dry_run"] or not pending:
+            self.stdout.write(f"{pending} records created before {day} would be archived.")
+            return
+
+        started = time.monotonic()
+        total_records = total_answers = 0
+        batch_size = max(1, options["batch_size"])
+        while True:
+            records, answers = archive_batch(cutoff, batch_size)
+            if not records:
+                break
+            total_records += records
+            total_answers += answers
+            self.stdout.write(f"  {total_records}/{pending} records")
+
+        if options["vacuum"]:
+            vacuum_live_tables()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {total_records} records / {total_answers} answers "
+            f"in {time.monotonic() - started:.1f}s"
+        ))
@@ -0,0 +1,120 @@
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter; prints wall-clock timestamps of each milestone.
+# The first submission is a real, valid one (serializer, DB insert, openpyxl load/save)
+# with OneDrive replaced by a stub and the DB insert rolled back.
+CHILD_SCRIPT = """
+import json, os, time
+marks = {}
+import timss_project.wsgi
+marks["app_loaded"] = time.time()
+from django.test import Client
+client = Client(HTTP_HOST="localhost")
+client.get("/auth/callback")
+marks["first_get"] = time.time()
+
+class StubGraphClient:
+    def download_file(self, remote_folder, remote_filename, local_path):
+        return False  # new workbook
+    def get_item_etag(self, remote_folder, remote_filename):
+        return None
+    def upload_large_file(self, local_path, remote_folder, remote_filename, **kwargs):
+        return {"eTag": "bench"}
+
+# Patched here (not at startup) so the excel_utils import still counts for this phase
+import main_app.excel_utils as excel_utils
+excel_utils.GraphUploadSessionClient = StubGraphClient
+excel_utils.EXCEL_DIR = os.environ["COLD_START_BENCH_DIR"]
+
+from django.db import connection, transaction
+payload = {
+    "school_name": "ColdStartBench", "subject": "Math", "grade": "4", "student_name": "Bench",
+    "answers": [{"question_number": "Q%d" % i, "answer_value": "A"} for i in range(1, 31)],
+}
+try:
+    connection.ensure_connection()
+    db_up = True
+except Exception:
+    db_up = False  # the view spools instead (reported by the parent)
+if db_up:
+    with transaction.atomic():
+        response = client.post("/api/submit-training/", payload, content_type="application/json")
+        transaction.set_rollback(True)  # never keep benchmark rows
+else:
+    response = client.post("/api/submit-training/", payload, content_type="application/json")
+marks["first_submit"] = time.time()
+marks["submit_body"] = response.json()
+print(json.dumps(marks))
+"""
+
+PHASES = ["app_loaded", "first_get", "first_submit"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark time-to-first-response of a fresh process (cold start): app import, first GET, "
+        "and a first valid submission (DB insert rolled back, OneDrive stubbed, so upload time is excluded)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument("--no-warmup", action="store_true", help="Set WARMUP_IMPORTS=False")
+
+    def handle(self, *args, **options):
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "timss_project.settings")}
+        if options["no_warmup"]:
+            env["WARMUP_IMPORTS"] = "False"
+        # Never talk to OneDrive from a benchmark (the child stubs the Graph client; blank
+        # credentials are a second guard). Empty, not unset: settings.py load_dotenv()
+        # would refill unset ones from .env
+        for name in ("AZURE_TENANT_ID", "AZURE_CLIENT_ID", "AZURE_CLIENT_SECRET", "ONEDRIVE_USER_EMAIL"):
+            env[name] = ""
+        env["WORKBOOK_CACHE_ENABLED"] = "False"
+        # Workbooks, and the spool if the DB is unreachable, stay out of the real directories
+        work_dir = tempfile.mkdtemp(prefix="cold-start-bench-")
+        env["COLD_START_BENCH_DIR"] = work_dir
+        env["DB_SPOOL_DIR"] = os.path.join(work_dir, "db_spool")
+        try:
+            self._bench(env, options)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _bench(self, env, options):
+
+        results = {phase: [] for phase in PHASES}
+        submit_issues = set()
+        for _ in range(max(1, options["runs"])):
+            started = time.time()
+            proc = subprocess.run(
+                [sys.executable, "-c", CHILD_SCRIPT],
+                cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+            )
+            if proc.returncode != 0:
+                raise CommandError(proc.stderr.strip().splitlines()[-1] if proc.stderr else "benchmark failed")
+            marks = json.loads(proc.stdout.strip().splitlines()[-1])
+            body = marks["submit_body"]
+            if not body.get("db_saved") or not body.get("excel_saved"):
+                submit_issues.add(f"db_error={body.get('db_error')} excel_error={body.get('excel_error')}")
+            for phase in PHASES:
+                results[phase].append((marks[phase] - started) * 1000)
+
+        self.stdout.write(f"Cold start over {options['runs']} runs (ms since process spawn):")
+        self.stdout.write(f"{'phase':<14} {'median':>8} {'min':>8} {'max':>8}")
+        for phase in PHASES:
+            values = results[phase]
+            self.stdout.write(
+                f"{phase:<14} {statistics.median(values):8.1f} {min(values):8.1f} {max(values):8.1f}"
+            )
+        for issue in submit_issues:
+            # Timings then miss the DB insert or the workbook save
+            self.stdout.write(self.style.WARNING(f"First submission was not fully processed: {issue}"))
@@ -0,0 +1,44 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main_app.services.item_analysis import run_item_analysis, parse_answer_key, parse_date_range
+
+
+class Command(BaseCommand):
+    help = "Compute per-question item statistics (difficulty, discrimination, distractors) as JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--subject", required=True)
+        parser.add_argument("--grade", required=True)
+        parser.add_argument("--date-from", default=None, help="YYYY-MM-DD (inclusive)")
+        parser.add_argument("--date-to", default=None, help="YYYY-MM-DD (inclusive)")
+        parser.add_argument("--key", default=None, help='Answer key, e.g. "Q1:A,Q2:B"')
+        parser.add_argument("--refresh", action="store_true", help="Ignore cached result and recompute")
+        parser.add_argument("--output", default=None, help="Write JSON to this file instead of stdout")
+
+    def handle(self, *args, **options):
+        try:
+            answer_key = parse_answer_key(options["key"])
+            date_from, date_to = parse_date_range(options["date_from"], options["date_to"])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        result = run_item_analysis(
+            subject=options["subject"],
+            grade=options["grade"],
+            date_from=date_from,
+            date_to=date_to,
+            answer_key=answer_key,
+            use_cache=not options["refresh"],
+        )
+
+        text = json.dumps(result, ensure_ascii=False, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                f.write(text)
+            self.stdout.write(self.style.SUCCESS(
+                f"Wrote analysis of {result['students']} students to {options['output']}"
+            ))
+        else:
+            self.stdout.write(text)
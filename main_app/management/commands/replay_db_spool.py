@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from main_app.services.db_circuit import replay_spool, SPOOL_DIR, REPLAY_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "Insert submissions spooled while the database was unreachable."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=REPLAY_BATCH_SIZE)
+        parser.add_argument(
+            "--include-claimed",
+            action="store_true",
+            help="Also replay claimed files that are not stale yet (make sure no replay is running); "
+                 "claims of dead processes are picked up automatically",
+        )
+
+    def handle(self, *args, **options):
+        replayed = replay_spool(
+            batch_size=max(1, options["batch_size"]),
+            include_claimed=options["include_claimed"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Replayed {replayed} records from {SPOOL_DIR}"))
@@ -0,0 +1,129 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from main_app.services.archive import LIVE, ARCHIVE, consistent_reads
+from main_app.services.scoring import get_all_compiled_keys
+
+
+def _rescore_batch(source, record_ids: list[int], keys: dict, batch_size: int) -> tuple[int, int, list[int]]:
+    """
+    Re-score one batch of records (runs in a worker thread with its own DB connection).
+    Returns (records updated, answers updated, ids no longer in this source).
+    """
+    record_model, answer_model = source
+    try:
+        with transaction.atomic():
+            # Row locks (same id order as archive_batch): a concurrent archive run waits until
+            # these are re-scored, and records it moved already show up as missing here
+            records = list(
+                record_model.objects
+                .filter(id__in=record_ids)
+                .order_by("id")
+                .select_for_update()
+                .values_list("id", "subject", "grade")
+            )
+            key_of = {rid: keys.get((subject, grade)) for rid, subject, grade in records}
+            moved = sorted(set(record_ids) - set(key_of))
+
+            answers = (
+                answer_model.objects
+                .filter(training_id__in=list(key_of))
+                .order_by("training_id", "id")
+                .values_list("id", "training_id", "question_number", "answer_value")
+            )
+
+            totals = {rid: 0 for rid, key in key_of.items() if key is not None}
+            answer_updates = []
+            for answer_id, training_id, question, value in answers:
+                key = key_of.get(training_id)
+                if key is None:
+                    continue
+                points, flags = key.score(((question, value),))
+                totals[training_id] += points
+                answer_updates.append(answer_model(id=answer_id, is_correct=flags[0]))
+
+            record_updates = [
+                record_model(id=rid, server_score_points=total) for rid, total in totals.items()
+            ]
+
+            answer_model.objects.bulk_update(answer_updates, ["is_correct"], batch_size=batch_size)
+            record_model.objects.bulk_update(record_updates, ["server_score_points"], batch_size=batch_size)
+
+        return len(record_updates), len(answer_updates), moved
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = "Re-score stored training records against the current answer keys (bulk, parallel)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--subject", default=None, help="Only records of this subject")
+        parser.add_argument("--grade", default=None, help="Only records of this grade")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Records per batch")
+        parser.add_argument("--workers", type=int, default=4, help="Parallel worker threads")
+        parser.add_argument("--skip-archive", action="store_true", help="Only re-score live (non-archived) records")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        keys = get_all_compiled_keys()
+        if options["subject"]:
+            keys = {k: v for k, v in keys.items() if k[0] == options["subject"]}
+        if options["grade"]:
+            keys = {k: v for k, v in keys.items() if k[1] == options["grade"]}
+
+        if not keys:
+            self.stdout.write(self.style.WARNING("No matching answer keys. Nothing to re-score."))
+            return
+
+        # Only records that have a key are touched (live + archived)
+        sources = [LIVE] if options["skip_archive"] else [LIVE, ARCHIVE]
+        batch_size = max(1, options["batch_size"])
+        batches = []
+        # One snapshot: a record being archived meanwhile is listed in exactly one source
+        with consistent_reads():
+            for source in sources:
+                record_model = source[0]
+                records = record_model.objects.none()
+                for subject, grade in keys:
+                    records = records | record_model.objects.filter(subject=subject, grade=grade)
+                record_ids = list(records.order_by("id").values_list("id", flat=True))
+                batches += [(source, record_ids[i:i + batch_size]) for i in range(0, len(record_ids), batch_size)]
+
+        self.stdout.write(f"Re-scoring {sum(len(b) for _, b in batches)} records in {len(batches)} batches...")
+
+        total_records = total_answers = 0
+        moved = []
+        with ThreadPoolExecutor(max_workers=max(1, options["workers"])) as pool:
+            futures = [
+                pool.submit(_rescore_batch, source, batch, keys, batch_size) for source, batch in batches
+            ]
+            for done, future in enumerate(as_completed(futures), 1):
+                n_records, n_answers, batch_moved = future.result()
+                total_records += n_records
+                total_answers += n_answers
+                moved += batch_moved
+                if done % 10 == 0 or done == len(futures):
+                    self.stdout.write(f"  {done}/{len(futures)} batches")
+
+            # Live records archived while we ran: re-score their archived copies
+            # (also with --skip-archive: they were live when selected)
+            if moved:
+                moved.sort()
+                self.stdout.write(f"  {len(moved)} records were archived meanwhile, re-scoring the archive copies")
+                futures = [
+                    pool.submit(_rescore_batch, ARCHIVE, moved[i:i + batch_size], keys, batch_size)
+                    for i in range(0, len(moved), batch_size)
+                ]
+                for future in as_completed(futures):
+                    n_records, n_answers, _gone = future.result()
+                    total_records += n_records
+                    total_answers += n_answers
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Re-scored {total_records} records / {total_answers} answers in {elapsed:.1f}s"
+        ))
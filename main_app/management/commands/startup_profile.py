@@ -0,0 +1,51 @@
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Same import path as a gunicorn worker (wsgi.py also runs warm_imports)
+PROFILE_SCRIPT = "import timss_project.wsgi"
+
+
+class Command(BaseCommand):
+    help = "Measure per-module import time of the app startup path (python -X importtime)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=25, help="Number of modules to show")
+        parser.add_argument(
+            "--sort", choices=["cumulative", "self"], default="cumulative",
+            help="cumulative includes sub-imports; self is the module body only",
+        )
+        parser.add_argument("--no-warmup", action="store_true", help="Set WARMUP_IMPORTS=False")
+
+    def handle(self, *args, **options):
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "timss_project.settings")}
+        if options["no_warmup"]:
+            env["WARMUP_IMPORTS"] = "False"
+
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", PROFILE_SCRIPT],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            raise CommandError(proc.stderr.strip().splitlines()[-1] if proc.stderr else "startup failed")
+
+        rows = []
+        for line in proc.stderr.splitlines():
+            # "import time:      1234 |       5678 |   package.module"
+            if not line.startswith("import time:") or "[us]" in line:
+                continue
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            depth = (len(name) - len(name.lstrip())) // 2
+            rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+
+        total_us = sum(r[2] for r in rows if r[3] == 0)
+        index = 1 if options["sort"] == "self" else 2
+        top = sorted(rows, key=lambda r: r[index], reverse=True)[:options["top"]]
+
+        self.stdout.write(f"Total import time: {total_us / 1000:.1f} ms ({len(rows)} modules)")
+        self.stdout.write(f"{'self ms':>9} {'cumul ms':>9}  module")
+        for name, self_us, cumulative_us, _depth in top:
+            self.stdout.write(f"{self_us / 1000:9.1f} {cumulative_us / 1000:9.1f}  {name}")
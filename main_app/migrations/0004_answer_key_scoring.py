@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0003_trainingrecord_gender_trainingrecord_grade_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='traininganswer',
+            name='is_correct',
+            field=models.BooleanField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='trainingrecord',
+            name='server_score_points',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='AnswerKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=100)),
+                ('grade', models.CharField(max_length=20)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('subject', 'grade'), name='unique_answer_key_subject_grade')],
+            },
+        ),
+        migrations.CreateModel(
+            name='AnswerKeyItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('question_number', models.CharField(max_length=10)),
+                ('correct_value', models.CharField(max_length=500)),
+                ('points', models.IntegerField(default=1)),
+                ('answer_key', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='main_app.answerkey')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('answer_key', 'question_number'), name='unique_answer_key_question')],
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:46
+
+import datetime
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0004_answer_key_scoring'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTrainingRecord',
+            fields=[
+                ('date', models.DateField(default=datetime.date.today)),
+                ('time', models.TimeField(default=datetime.datetime.now)),
+                ('subject', models.CharField(default='Unknown', max_length=100)),
+                ('student_name', models.CharField(default='Unknown', max_length=200)),
+                ('gender', models.CharField(default='Unknown', max_length=20)),
+                ('grade', models.CharField(default='Unknown', max_length=20)),
+                ('user_role', models.CharField(default='Unknown', max_length=20)),
+                ('school_operation_region', models.CharField(default='Unknown', max_length=200)),
+                ('school_name', models.CharField(default='Unknown', max_length=200)),
+                ('class_name', models.CharField(default='Unknown', max_length=100)),
+                ('teacher_name', models.CharField(default='Unknown', max_length=200)),
+                ('auto_correct_score_points', models.IntegerField(blank=True, null=True)),
+                ('server_score_points', models.IntegerField(blank=True, null=True)),
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(db_index=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['subject', 'grade', 'date'], name='archived_record_sgd_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedTrainingAnswer',
+            fields=[
+                ('question_number', models.CharField(max_length=10)),
+                ('answer_value', models.CharField(blank=True, max_length=500, null=True)),
+                ('is_correct', models.BooleanField(blank=True, null=True)),
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('training', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='main_app.archivedtrainingrecord')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
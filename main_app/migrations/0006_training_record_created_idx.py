@@ -0,0 +1,45 @@
+from django.db import migrations, models
+
+
+class AddIndexConcurrentlyOnPostgres(migrations.AddIndex):
+    """
+    AddIndexConcurrently on PostgreSQL, so building the index on a large live
+    training_record table does not block submissions; plain AddIndex elsewhere
+    (SQLite in development). django.contrib.postgres is imported lazily because
+    it needs psycopg.
+    """
+
+    def _concurrent(self, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return None
+        from django.contrib.postgres.operations import AddIndexConcurrently
+
+        return AddIndexConcurrently(self.model_name, self.index)
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        operation = self._concurrent(schema_editor)
+        if operation is None:
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        return operation.database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        operation = self._concurrent(schema_editor)
+        if operation is None:
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        return operation.database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('main_app', '0005_training_archive'),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyOnPostgres(
+            model_name='trainingrecord',
+            index=models.Index(fields=['created_at'], name='training_record_created_idx'),
+        ),
+    ]
@@ -1,7 +1,9 @@
 import datetime
 from django.db import models
+from django.utils import timezone
 
-class TrainingRecord(models.Model):
+class TrainingRecordFields(models.Model):
+    # الحقول المشتركة بين السجلات الحالية والمؤرشفة
     # معلومات التدريب
     date = models.DateField(default=datetime.date.today)  # default لتجنب مشاكل الصفوف القديمة
     time = models.TimeField(default=datetime.datetime.now)
@@ -19,22 +21,111 @@ class TrainingRecord(models.Model):
     
     # مجموع النقاط (من Storyline)
     auto_correct_score_points = models.IntegerField(null=True, blank=True)
-    
-    # تاريخ ووقت إنشاء السجل
-    created_at = models.DateTimeField(auto_now_add=True)
+
+    # مجموع النقاط محسوب في السيرفر من مفتاح الإجابة (null = لا يوجد مفتاح)
+    server_score_points = models.IntegerField(null=True, blank=True)
+
+    class Meta:
+        abstract = True
 
     def __str__(self):
         return f"{self.student_name} - {self.subject}"
 
 
-class TrainingAnswer(models.Model):
+class TrainingRecord(TrainingRecordFields):
+    # تاريخ ووقت إنشاء السجل (مفهرس للأرشفة حسب الفصل الدراسي)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # يُنشأ بدون قفل الجدول على PostgreSQL (انظر migration 0006)
+            models.Index(fields=["created_at"], name="training_record_created_idx"),
+        ]
+
+
+class TrainingAnswerFields(models.Model):
+    question_number = models.CharField(max_length=10)   # مثال: "Q1", "Q1a"
+    answer_value = models.CharField(max_length=500, blank=True, null=True)
+    is_correct = models.BooleanField(null=True, blank=True)  # null = السؤال غير موجود في المفتاح
+
+    class Meta:
+        abstract = True
+
+    def __str__(self):
+        return f"{self.training.student_name} - {self.question_number}"
+
+
+class TrainingAnswer(TrainingAnswerFields):
     training = models.ForeignKey(
         TrainingRecord,
         on_delete=models.CASCADE,
         related_name="answers"
     )
-    question_number = models.CharField(max_length=10)   # مثال: "Q1", "Q1a"
-    answer_value = models.CharField(max_length=500, blank=True, null=True)
+
+
+# ======================
+# ARCHIVE (closed terms, moved by the archive_training command)
+# ======================
+class ArchivedTrainingRecord(TrainingRecordFields):
+    # نفس رقم السجل الأصلي
+    id = models.BigIntegerField(primary_key=True)
+    created_at = models.DateTimeField(db_index=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["subject", "grade", "date"], name="archived_record_sgd_idx"),
+        ]
+
+
+class ArchivedTrainingAnswer(TrainingAnswerFields):
+    id = models.BigIntegerField(primary_key=True)
+    training = models.ForeignKey(
+        ArchivedTrainingRecord,
+        on_delete=models.CASCADE,
+        related_name="answers"
+    )
+
+
+class AnswerKey(models.Model):
+    # مفتاح الإجابة لكل مادة وصف
+    subject = models.CharField(max_length=100)
+    grade = models.CharField(max_length=20)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["subject", "grade"], name="unique_answer_key_subject_grade"),
+        ]
 
     def __str__(self):
-        return f"{self.training.student_name} - {self.question_number}"
+        return f"{self.subject} - {self.grade}"
+
+
+class AnswerKeyItem(models.Model):
+    answer_key = models.ForeignKey(
+        AnswerKey,
+        on_delete=models.CASCADE,
+        related_name="items"
+    )
+    question_number = models.CharField(max_length=10)
+    correct_value = models.CharField(max_length=500)
+    points = models.IntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["answer_key", "question_number"], name="unique_answer_key_question"),
+        ]
+
+    # Bump the key's updated_at so compiled keys (services/scoring.py) are rebuilt
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        AnswerKey.objects.filter(pk=self.answer_key_id).update(updated_at=timezone.now())
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        AnswerKey.objects.filter(pk=self.answer_key_id).update(updated_at=timezone.now())
+        return result
+
+    def __str__(self):
+        return f"{self.answer_key} - {self.question_number}"
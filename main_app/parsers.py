@@ -0,0 +1,54 @@
+import gzip
+import io
+import os
+import zlib
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+# Guard against decompression bombs (compressed JSON shrinks ~10-20x)
+MAX_DECOMPRESSED_BYTES = _env_int("MAX_DECOMPRESSED_BODY_MB", 10) * 1024 * 1024
+
+
+class GzipJSONParser(JSONParser):
+    """
+    JSONParser that also accepts `Content-Encoding: gzip` (or deflate) request bodies,
+    for schools on slow links. Uncompressed bodies are parsed as before.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = (parser_context or {}).get("request")
+        encoding = ""
+        if request is not None:
+            encoding = request.META.get("HTTP_CONTENT_ENCODING", "").strip().lower()
+
+        if encoding in ("gzip", "x-gzip", "deflate") and stream is not None:
+            stream = io.BytesIO(_decompress(stream.read(), encoding))
+        elif encoding not in ("", "identity"):
+            raise ParseError(f"Unsupported Content-Encoding: {encoding}")
+
+        return super().parse(stream, media_type, parser_context)
+
+
+def _decompress(body: bytes, encoding: str) -> bytes:
+    try:
+        if encoding == "deflate":
+            decompressor = zlib.decompressobj()
+            data = decompressor.decompress(body, MAX_DECOMPRESSED_BYTES + 1)
+        else:
+            with gzip.GzipFile(fileobj=io.BytesIO(body)) as f:
+                data = f.read(MAX_DECOMPRESSED_BYTES + 1)
+    except (OSError, EOFError, zlib.error) as e:
+        raise ParseError(f"Invalid {encoding} body: {e}")
+
+    if len(data) > MAX_DECOMPRESSED_BYTES:
+        raise ParseError("Decompressed request body too large")
+    return data
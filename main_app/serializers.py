@@ -1,5 +1,7 @@
+from django.db import transaction
 from rest_framework import serializers
 from .models import TrainingRecord, TrainingAnswer
+from .services.scoring import get_compiled_key
 
 class TrainingAnswerSerializer(serializers.ModelSerializer):
     class Meta:
@@ -18,8 +20,46 @@ class TrainingRecordSerializer(serializers.ModelSerializer):
         ]
 
     def create(self, validated_data):
-        answers_data = validated_data.pop('answers', [])
-        training = TrainingRecord.objects.create(**validated_data)
-        for ans in answers_data:
-            TrainingAnswer.objects.create(training=training, **ans)
-        return training
+        return bulk_create_trainings([validated_data])[0]
+
+
+def _build_training(validated_data: dict, key) -> tuple[TrainingRecord, list[TrainingAnswer]]:
+    validated_data = dict(validated_data)
+    answers_data = validated_data.pop('answers', [])
+
+    # Server-side scoring against the subject/grade answer key (if any)
+    flags = [None] * len(answers_data)
+    if key is not None:
+        validated_data['server_score_points'], flags = key.score(
+            (ans.get('question_number'), ans.get('answer_value')) for ans in answers_data
+        )
+
+    training = TrainingRecord(**validated_data)
+    answers = [TrainingAnswer(is_correct=ok, **ans) for ans, ok in zip(answers_data, flags)]
+    return training, answers
+
+
+def bulk_create_trainings(validated_list: list[dict]) -> list[TrainingRecord]:
+    """
+    Create many validated TrainingRecord payloads (with answers) using two bulk inserts.
+    """
+    # One answer-key lookup per distinct subject/grade, not per record
+    keys = {}
+    for data in validated_list:
+        subject_grade = (data.get('subject'), data.get('grade'))
+        if subject_grade not in keys:
+            keys[subject_grade] = get_compiled_key(*subject_grade)
+
+    built = [
+        _build_training(data, keys[(data.get('subject'), data.get('grade'))])
+        for data in validated_list
+    ]
+    with transaction.atomic():
+        trainings = TrainingRecord.objects.bulk_create([training for training, _ in built])
+        all_answers = []
+        for training, answers in built:
+            for answer in answers:
+                answer.training = training
+            all_answers.extend(answers)
+        TrainingAnswer.objects.bulk_create(all_answers)
+    return trainings
@@ -0,0 +1,103 @@
+import datetime
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils.dateparse import parse_date
+
+from main_app.models import (
+    TrainingRecord, TrainingAnswer, ArchivedTrainingRecord, ArchivedTrainingAnswer,
+)
+
+# (record model, answer model) pairs. Ids are preserved when archiving, so a record id
+# is unique across live + archive and readers can merge both sources.
+LIVE = (TrainingRecord, TrainingAnswer)
+ARCHIVE = (ArchivedTrainingRecord, ArchivedTrainingAnswer)
+
+RECORD_FIELDS = [f.attname for f in TrainingRecord._meta.concrete_fields]
+ANSWER_FIELDS = [f.attname for f in TrainingAnswer._meta.concrete_fields]
+
+
+def training_sources(subject: str | None = None, grade: str | None = None, date_from=None):
+    """
+    Sources to read for a query, live first. The archive is skipped when the query
+    starts after the newest archived training date (uses the subject/grade/date index).
+    """
+    if date_from and subject and grade:
+        date_from = _as_date(date_from)
+        newest = (
+            ArchivedTrainingRecord.objects
+            .filter(subject=subject, grade=grade)
+            .aggregate(newest=Max("date"))["newest"]
+        )
+        if newest is None or newest < date_from:
+            return [LIVE]
+    return [LIVE, ARCHIVE]
+
+
+def _as_date(value) -> datetime.date:
+    # Callers may pass a date, a datetime or a "YYYY-MM-DD" string
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    parsed = parse_date(str(value))
+    if parsed is None:
+        raise ValueError(f"Invalid date: {value!r}")
+    return parsed
+
+
+@contextmanager
+def consistent_reads():
+    """
+    Run reads that span live + archive in one transaction, so a record moved by a
+    concurrent archive_batch() is seen in exactly one source. PostgreSQL's default
+    READ COMMITTED takes a new snapshot per statement, so the outermost block switches
+    to REPEATABLE READ (must be the first statement of the transaction).
+    """
+    outermost = not connection.in_atomic_block
+    with transaction.atomic():
+        if outermost and connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        yield
+
+
+def archive_batch(cutoff, batch_size: int) -> tuple[int, int]:
+    """
+    Move up to batch_size live records created before cutoff (and their answers)
+    into the archive tables in one transaction. Returns (records, answers) moved.
+    The rows are locked first, so a concurrent rescore either finishes before they
+    are copied or finds them moved (see rescore_training).
+    """
+    with transaction.atomic():
+        ids = list(
+            TrainingRecord.objects
+            .filter(created_at__lt=cutoff)
+            .order_by("id")
+            .select_for_update()
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0, 0
+
+        records = TrainingRecord.objects.filter(id__in=ids).values(*RECORD_FIELDS)
+        ArchivedTrainingRecord.objects.bulk_create([ArchivedTrainingRecord(**r) for r in records])
+
+        answers = TrainingAnswer.objects.filter(training_id__in=ids).values(*ANSWER_FIELDS)
+        archived_answers = [ArchivedTrainingAnswer(**a) for a in answers]
+        ArchivedTrainingAnswer.objects.bulk_create(archived_answers, batch_size=5000)
+
+        TrainingAnswer.objects.filter(training_id__in=ids).delete()
+        TrainingRecord.objects.filter(id__in=ids).delete()
+
+    return len(ids), len(archived_answers)
+
+
+def vacuum_live_tables():
+    # Reclaim space/refresh stats after large moves (PostgreSQL only, outside a transaction)
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        for model in (TrainingAnswer, TrainingRecord):
+            cursor.execute(f'VACUUM (ANALYZE) "{model._meta.db_table}"')
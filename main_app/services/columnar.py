@@ -0,0 +1,156 @@
+"""
+Compact columnar batch format for low-bandwidth submissions:
+
+{
+  "header":    {"school_name": "...", "subject": "Math", "grade": "4", "date": "2026-03-01", ...},
+  "columns":   {"student_name": ["A", "B"], "gender": ["F", "M"], "auto_correct_score_points": [7, 9]},
+  "questions": ["Q1", "Q2", "Q3"],
+  "answers":   [["A", "C", "B"], ["A", "D", null]]
+}
+
+Shared fields are sent (and validated) once in "header"; per-student fields are arrays
+in "columns"; "answers" holds one vector per student aligned with "questions".
+Any TrainingRecordSerializer field except "answers" may go in header or columns.
+"""
+from rest_framework import serializers
+
+from main_app.serializers import TrainingRecordSerializer, TrainingAnswerSerializer
+
+MAX_BATCH_RECORDS = 1000
+
+
+class ColumnarBatchError(ValueError):
+    pass
+
+
+def _record_fields():
+    fields = TrainingRecordSerializer().fields
+    return {name: field for name, field in fields.items() if name != "answers"}
+
+
+def _validate(field, value):
+    try:
+        return field.run_validation(value), None
+    except serializers.ValidationError as e:
+        return None, e.detail
+
+
+def decode_batch(payload) -> tuple[list[dict], list[dict], dict]:
+    """
+    Returns (raw_records, validated_records, errors).
+
+    raw_records: per-student dicts in the single-submission shape (used for Excel).
+    validated_records: validated_data dicts for students without errors (for the DB).
+    errors: {row_index: {field: [...]}} plus "header"/"questions" keys for shared errors;
+            rows with errors are left out of validated_records.
+    Raises ColumnarBatchError when the batch is structurally malformed.
+    """
+    if not isinstance(payload, dict):
+        raise ColumnarBatchError("Batch must be a JSON object")
+
+    header = payload.get("header") or {}
+    columns = payload.get("columns") or {}
+    questions = payload.get("questions") or []
+    answers = payload.get("answers") or []
+    if not isinstance(header, dict) or not isinstance(columns, dict):
+        raise ColumnarBatchError('"header" and "columns" must be objects')
+    if not isinstance(questions, list) or not isinstance(answers, list):
+        raise ColumnarBatchError('"questions" and "answers" must be arrays')
+
+    record_fields = _record_fields()
+    unknown = (set(header) | set(columns)) - set(record_fields)
+    if unknown:
+        raise ColumnarBatchError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    overlap = set(header) & set(columns)
+    if overlap:
+        raise ColumnarBatchError(f"Fields in both header and columns: {', '.join(sorted(overlap))}")
+
+    n = len(answers) if answers else max((len(v) for v in columns.values() if isinstance(v, list)), default=0)
+    for name, values in columns.items():
+        if not isinstance(values, list) or len(values) != n:
+            raise ColumnarBatchError(f'Column "{name}" must be an array of {n} values')
+    if n > MAX_BATCH_RECORDS:
+        raise ColumnarBatchError(f"Batch too large ({n} > {MAX_BATCH_RECORDS} records)")
+    for row in answers:
+        if not isinstance(row, list) or len(row) != len(questions):
+            raise ColumnarBatchError(f"Each answers row must have {len(questions)} values")
+    # Question labels key the per-question errors and the answers of every student
+    if not all(isinstance(q, str) for q in questions):
+        raise ColumnarBatchError('"questions" must be an array of strings')
+
+    errors = {}
+
+    # Shared values: validated once for the whole batch
+    header_validated = {}
+    for name, value in header.items():
+        validated, error = _validate(record_fields[name], value)
+        if error is not None:
+            errors.setdefault("header", {})[name] = error
+        header_validated[name] = validated
+
+    answer_fields = TrainingAnswerSerializer().fields
+    question_field = answer_fields["question_number"]
+    value_field = answer_fields["answer_value"]
+    questions_validated = []
+    for question in questions:
+        validated, error = _validate(question_field, question)
+        if error is not None:
+            errors.setdefault("questions", {})[question] = error
+        questions_validated.append(validated)
+
+    # Per-student columns: validated value by value, column by column
+    column_validated = {}
+    row_errors: dict[int, dict] = {}
+    for name, values in columns.items():
+        field = record_fields[name]
+        out = []
+        for i, value in enumerate(values):
+            validated, error = _validate(field, value)
+            if error is not None:
+                row_errors.setdefault(i, {})[name] = error
+            out.append(validated)
+        column_validated[name] = out
+
+    # Answer cells go through the same field as single submissions (type, trimming, NUL
+    # rejection). Cells repeat a lot ("A", "B", null...): validate each distinct string once.
+    cell_cache: dict = {}
+    answer_rows = []
+    for i, row in enumerate(answers):
+        cleaned = []
+        for question, value in zip(questions, row):
+            if value is None or isinstance(value, str):
+                if value not in cell_cache:
+                    cell_cache[value] = _validate(value_field, value)
+                validated, error = cell_cache[value]
+            else:
+                validated, error = _validate(value_field, value)
+            if error is not None:
+                row_errors.setdefault(i, {}).setdefault("answers", {})[question] = error
+            cleaned.append(validated)
+        answer_rows.append(cleaned)
+
+    raw_records, validated_records = [], []
+    shared_ok = "header" not in errors and "questions" not in errors
+    column_names = list(columns)
+    for i in range(n):
+        raw = dict(header)
+        for name in column_names:
+            raw[name] = columns[name][i]
+        # Raw values for Excel, like the single-submission path (request.data)
+        raw["answers"] = [
+            {"question_number": q, "answer_value": v} for q, v in zip(questions, answers[i] if answers else [])
+        ]
+        raw_records.append(raw)
+
+        if shared_ok and i not in row_errors:
+            validated = dict(header_validated)
+            for name in column_names:
+                validated[name] = column_validated[name][i]
+            validated["answers"] = [
+                {"question_number": q, "answer_value": v}
+                for q, v in zip(questions_validated, answer_rows[i] if answers else [])
+            ]
+            validated_records.append(validated)
+
+    errors.update(row_errors)
+    return raw_records, validated_records, errors
@@ -0,0 +1,314 @@
+import fcntl
+import glob
+import json
+import os
+import threading
+import time
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import InterfaceError, OperationalError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+SPOOL_DIR = os.getenv("DB_SPOOL_DIR", os.path.join(os.getcwd(), "db_spool"))
+REPLAY_BATCH_SIZE = 500
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+# A claimed file untouched this long is treated as left by a crashed replay
+CLAIM_STALE_SECONDS = _env_float("DB_SPOOL_CLAIM_STALE_SECONDS", 600)
+
+
+def is_connection_error(exc: Exception) -> bool:
+    # Only "DB unreachable" errors trip the breaker; IntegrityError etc. are real bugs/data issues
+    return isinstance(exc, (OperationalError, InterfaceError))
+
+
+# ======================
+# CIRCUIT BREAKER
+# ======================
+class CircuitBreaker:
+    """
+    closed     -> requests go to the DB; failure_threshold consecutive connection errors open it
+    open       -> requests skip the DB immediately until reset_timeout has passed
+    half_open  -> exactly one request probes the DB; success closes, failure re-opens
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0, on_close=None):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.on_close = on_close
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN  # this caller is the probe
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            recovered = self.state != self.CLOSED
+            self.state = self.CLOSED
+            self.failures = 0
+        if recovered:
+            print("[DB Breaker] Closed: database reachable again.")
+            if self.on_close is not None:
+                self.on_close()
+
+    def record_result(self, exc: Exception | None = None):
+        """
+        Resolve a request (including a half-open probe): connection errors count as
+        failures; success or any other error means the DB answered, so the breaker closes.
+        """
+        if exc is not None and is_connection_error(exc):
+            self.record_failure()
+        else:
+            self.record_success()
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    print(f"[DB Breaker] Open: skipping DB for {self.reset_timeout:.0f}s.")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+# ======================
+# SPOOL (JSON lines, one file per process)
+# ======================
+def _spool_path() -> str:
+    return os.path.join(SPOOL_DIR, f"spool-{os.getpid()}.jsonl")
+
+
+_spool_lock = threading.Lock()
+
+
+def spool_payload(validated_data: dict):
+    """
+    Append a validated payload to this process's spool file.
+    date/time defaults and the submission time are fixed now, so a later replay
+    stores the same values as a direct save would have.
+    """
+    data = dict(validated_data)
+    now = timezone.now()
+    local_now = timezone.localtime(now) if timezone.is_aware(now) else now
+    data.setdefault("date", local_now.date())
+    data.setdefault("time", local_now.time())
+    line = json.dumps({"spooled_at": now, "data": data}, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    path = _spool_path()
+    with _spool_lock:
+        while True:
+            with open(path, "a", encoding="utf-8") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                # A replay may have claimed (renamed) the file between open and lock
+                try:
+                    same_file = os.fstat(f.fileno()).st_ino == os.stat(path).st_ino
+                except FileNotFoundError:
+                    same_file = False
+                if not same_file:
+                    continue
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+                return
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _stale_claims() -> list[str]:
+    """
+    Claimed files whose replay died: the claiming process is gone, or the file has not
+    been touched (replays rewrite it after every batch) for CLAIM_STALE_SECONDS.
+    """
+    stale = []
+    now = time.time()
+    for path in sorted(glob.glob(os.path.join(SPOOL_DIR, "*.claimed"))):
+        try:
+            pid = int(path.rsplit(".", 3)[-3])
+            age = now - os.path.getmtime(path)
+        except (ValueError, IndexError, FileNotFoundError):
+            continue
+        if age >= CLAIM_STALE_SECONDS or (pid != os.getpid() and not _pid_alive(pid)):
+            stale.append(path)
+    return stale
+
+
+def spool_pending() -> bool:
+    # Includes files of restarted workers (any pid) and claims left by a crashed replay
+    return bool(glob.glob(os.path.join(SPOOL_DIR, "spool-*.jsonl"))) or bool(_stale_claims())
+
+
+def _claim_spool_files(include_claimed: bool = False) -> list[str]:
+    """
+    Atomically rename spool files so concurrent writers/replayers leave them alone.
+    Stale claims (see _stale_claims) are re-claimed the same way.
+    """
+    claimed = []
+    for path in _stale_claims():
+        target = f"{path.split('.jsonl.', 1)[0]}.jsonl.{os.getpid()}.{time.time_ns()}.claimed"
+        try:
+            os.rename(path, target)
+        except FileNotFoundError:
+            continue  # re-claimed by another process
+        print(f"[DB Spool] Re-claiming stale {os.path.basename(path)}")
+        claimed.append(target)
+
+    for path in sorted(glob.glob(os.path.join(SPOOL_DIR, "spool-*.jsonl"))):
+        target = f"{path}.{os.getpid()}.{time.time_ns()}.claimed"
+        try:
+            os.rename(path, target)
+        except FileNotFoundError:
+            continue  # claimed by another process
+        # Wait for an in-flight append (holding the lock) to finish
+        with open(target, "rb") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        claimed.append(target)
+
+    if include_claimed:
+        # Leftovers of a replay that crashed midway
+        for path in sorted(glob.glob(os.path.join(SPOOL_DIR, "*.claimed"))):
+            if path not in claimed:
+                claimed.append(path)
+    return claimed
+
+
+def _spool_base(path: str) -> str:
+    # "spool-<pid>" of any spool file name (spool-<pid>[-<ns>].jsonl[.<pid>.<ns>.claimed])
+    name = os.path.basename(path).split(".", 1)[0]
+    return os.path.join(os.path.dirname(path), "-".join(name.split("-")[:2]))
+
+
+def _release_claim(path: str):
+    # Put an unreplayed file back so the next replay picks it up
+    os.rename(path, f"{_spool_base(path)}-{time.time_ns()}.jsonl")
+
+
+def _quarantine(path: str):
+    # Not a connection problem: retrying would fail the same way on every request.
+    # *.failed files are ignored by spool_pending()/replays; inspect and fix them by hand.
+    target = f"{_spool_base(path)}-{time.time_ns()}.jsonl.failed"
+    os.rename(path, target)
+    print(f"[DB Spool] Quarantined {os.path.basename(target)}")
+
+
+def replay_spool(batch_size: int = REPLAY_BATCH_SIZE, include_claimed: bool = False) -> int:
+    """
+    Insert spooled payloads into the DB in bulk. Returns the number of records inserted.
+    A file is deleted only after all its records are committed. If the DB connection is
+    lost it is put back for the next replay; any other failure quarantines it (*.failed).
+    """
+    from main_app.models import TrainingRecord
+    from main_app.serializers import TrainingRecordSerializer, bulk_create_trainings
+
+    replayed = 0
+    claimed = _claim_spool_files(include_claimed=include_claimed)
+    for i, path in enumerate(claimed):
+        try:
+            with open(path, encoding="utf-8") as f:
+                lines = [line for line in f if line.strip()]
+
+            # Payloads already passed validation once; re-run it to get typed values back
+            valid_lines, validated, spooled_at = [], [], []
+            for line in lines:
+                item = json.loads(line)
+                serializer = TrainingRecordSerializer(data=item["data"])
+                if not serializer.is_valid():
+                    print(f"[DB Spool] Dropping invalid spooled payload: {serializer.errors}")
+                    continue
+                valid_lines.append(line)
+                validated.append(serializer.validated_data)
+                spooled_at.append(parse_datetime(item["spooled_at"]))
+
+            for start in range(0, len(validated), batch_size):
+                with transaction.atomic():
+                    trainings = bulk_create_trainings(validated[start:start + batch_size])
+                    # Keep the original submission time instead of the replay time
+                    for training, ts in zip(trainings, spooled_at[start:start + batch_size]):
+                        training.created_at = ts
+                    TrainingRecord.objects.bulk_update(trainings, ["created_at"])
+                # Drop committed lines so a failure later in the file does not duplicate them
+                _rewrite_remaining(path, valid_lines, start + batch_size)
+                replayed += len(trainings)
+
+            os.remove(path)
+        except Exception as e:
+            print(f"[DB Spool] Replay of {os.path.basename(path)} failed: {e}")
+            if is_connection_error(e):
+                # DB went away: put everything back for the next replay
+                for remaining in claimed[i:]:
+                    try:
+                        _release_claim(remaining)
+                    except OSError as rename_error:
+                        print(f"[DB Spool] Could not release {os.path.basename(remaining)}: {rename_error}")
+                break
+            try:
+                _quarantine(path)
+            except OSError as rename_error:
+                print(f"[DB Spool] Could not quarantine {os.path.basename(path)}: {rename_error}")
+
+    if replayed:
+        print(f"[DB Spool] Replayed {replayed} records.")
+    return replayed
+
+
+def _rewrite_remaining(path: str, lines: list[str], done: int):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.writelines(lines[done:])
+    os.replace(tmp, path)
+
+
+_replay_lock = threading.Lock()
+
+
+def replay_spool_in_background():
+    if not spool_pending():
+        return
+    if not _replay_lock.acquire(blocking=False):
+        return  # a replay is already running in this process
+
+    def run():
+        try:
+            replay_spool()
+        finally:
+            from django.db import connection
+            connection.close()
+            _replay_lock.release()
+
+    threading.Thread(target=run, name="db-spool-replay", daemon=True).start()
+
+
+db_breaker = CircuitBreaker(
+    failure_threshold=int(_env_float("DB_BREAKER_FAILURES", 3)),
+    reset_timeout=_env_float("DB_BREAKER_RESET_SECONDS", 30),
+    on_close=replay_spool_in_background,
+)
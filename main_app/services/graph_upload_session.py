@@ -1,9 +1,15 @@
 import os
+import threading
 import time
 import requests
 
 GRAPH_BASE = "https://graph.microsoft.com/v1.0"
 
+# App token shared by all clients in this process (client credentials tokens live ~1h)
+_TOKEN_CACHE = {"token": None, "expires_at": 0.0}
+_TOKEN_LOCK = threading.Lock()
+_TOKEN_REFRESH_MARGIN = 300  # seconds before expiry
+
 
 class GraphUploadSessionClient:
     def __init__(self):
@@ -25,6 +31,18 @@ class GraphUploadSessionClient:
         self._token = None
 
     def get_app_token(self) -> str:
+        """
+        Return a cached app token, requesting a new one only when it is about to expire.
+        """
+        with _TOKEN_LOCK:
+            if _TOKEN_CACHE["token"] and time.time() < _TOKEN_CACHE["expires_at"] - _TOKEN_REFRESH_MARGIN:
+                self._token = _TOKEN_CACHE["token"]
+                return self._token
+
+            self._token = self._request_app_token()
+            return self._token
+
+    def _request_app_token(self) -> str:
         token_url = f"https://login.microsoftonline.com/{self.tenant_id}/oauth2/v2.0/token"
         data = {
             "client_id": self.client_id,
@@ -34,8 +52,10 @@ class GraphUploadSessionClient:
         }
         r = requests.post(token_url, data=data, timeout=30)
         r.raise_for_status()
-        self._token = r.json()["access_token"]
-        return self._token
+        body = r.json()
+        _TOKEN_CACHE["token"] = body["access_token"]
+        _TOKEN_CACHE["expires_at"] = time.time() + int(body.get("expires_in", 3600))
+        return body["access_token"]
 
     def _headers(self):
         if not self._token:
@@ -61,19 +81,33 @@ class GraphUploadSessionClient:
             f.write(r.content)
         return True
 
-    def create_upload_session(self, remote_path: str) -> str:
+    def get_item_etag(self, remote_folder: str, remote_filename: str) -> str | None:
+        """
+        Return the current eTag of a OneDrive file, or None if it does not exist (404).
+        Cheap metadata call used to validate cached workbooks without downloading them.
+        """
+        remote_path = f"{self.root_folder}/{remote_folder}/{remote_filename}"
+        url = f"{GRAPH_BASE}/users/{self.user_email}/drive/root:/{remote_path}"
+
+        r = requests.get(url, headers=self._headers(), params={"$select": "eTag"}, timeout=30)
+        if r.status_code == 404:
+            return None
+        r.raise_for_status()
+        return r.json().get("eTag")
+
+    def create_upload_session(self, remote_path: str, if_match: str | None = None) -> str:
         """
         Create an upload session for a file path. Force replace to update the same file.
+        With if_match (an eTag), OneDrive answers 412 if the file changed since then.
         """
         url = f"{GRAPH_BASE}/users/{self.user_email}/drive/root:/{remote_path}:/createUploadSession"
         payload = {"item": {"@microsoft.graph.conflictBehavior": "replace"}}
 
-        r = requests.post(
-            url,
-            headers={**self._headers(), "Content-Type": "application/json"},
-            json=payload,
-            timeout=30
-        )
+        headers = {**self._headers(), "Content-Type": "application/json"}
+        if if_match:
+            headers["If-Match"] = if_match
+
+        r = requests.post(url, headers=headers, json=payload, timeout=30)
         r.raise_for_status()
         return r.json()["uploadUrl"]
 
@@ -83,13 +117,16 @@ class GraphUploadSessionClient:
         remote_folder: str,
         remote_filename: str,
         chunk_size_mb: int = 10,
-        max_retries: int = 1
+        max_retries: int = 1,
+        if_match: str | None = None,
     ) -> dict:
         """
         Chunked upload with retries for:
         - 423 Locked (file open / temporary lock)
         - 409 Conflict (session conflict / concurrent update)
         - 429/503 throttling
+        if_match: only replace the remote file if it still has this eTag (412 otherwise,
+        raised as requests.HTTPError and never retried).
         NOTE: In our current setup we keep max_retries low to avoid OOM on Render Free.
         """
         chunk_size = chunk_size_mb * 1024 * 1024
@@ -99,7 +136,7 @@ class GraphUploadSessionClient:
 
         for attempt in range(1, max_retries + 1):
             try:
-                upload_url = self.create_upload_session(remote_path)
+                upload_url = self.create_upload_session(remote_path, if_match=if_match)
 
                 start = 0
                 with open(local_path, "rb") as f:
@@ -0,0 +1,378 @@
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+from django.core.cache import cache
+from django.utils.dateparse import parse_date
+
+from main_app.services.archive import consistent_reads, training_sources
+from main_app.services.scoring import get_compiled_key, normalize_answer
+
+CHUNK_SIZE = 2000
+CACHE_PREFIX = "item_analysis"
+MISSING = -1
+
+
+def _cache_timeout() -> int:
+    try:
+        return int(os.getenv("ITEM_ANALYSIS_CACHE_SECONDS", 600))
+    except ValueError:
+        return 600
+
+
+def _question_sort_key(q: str):
+    # "Q2" < "Q10", "Q1" < "Q1a"
+    return [int(p) if p.isdigit() else p for p in re.split(r"(\d+)", q or "")]
+
+
+def _normalize(value) -> str | None:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def cache_key(subject: str, grade: str, date_from=None, date_to=None, answer_key: dict | None = None) -> str:
+    key_hash = ""
+    if answer_key:
+        key_hash = hashlib.md5(json.dumps(answer_key, sort_keys=True).encode()).hexdigest()[:12]
+    return f"{CACHE_PREFIX}:{subject}:{grade}:{date_from or ''}:{date_to or ''}:{key_hash}"
+
+
+def parse_answer_key(raw: str | None) -> dict | None:
+    """
+    "Q1:A,Q2:B" -> {"Q1": "A", "Q2": "B"}
+    """
+    if not raw:
+        return None
+    key = {}
+    for part in raw.split(","):
+        question, sep, value = part.partition(":")
+        if not sep or not question.strip():
+            raise ValueError(f"Invalid answer key entry: {part!r} (expected QUESTION:VALUE)")
+        key[question.strip()] = value.strip()
+    return key
+
+
+def parse_date_range(date_from: str | None, date_to: str | None):
+    """
+    "YYYY-MM-DD" strings (or None) -> (date | None, date | None). Raises ValueError.
+    """
+    parsed = []
+    for name, raw in (("date_from", date_from), ("date_to", date_to)):
+        if not raw:
+            parsed.append(None)
+            continue
+        try:
+            value = parse_date(str(raw))
+        except ValueError:
+            value = None
+        if value is None:
+            raise ValueError(f"Invalid {name}: {raw!r} (expected YYYY-MM-DD)")
+        parsed.append(value)
+
+    if parsed[0] and parsed[1] and parsed[0] > parsed[1]:
+        raise ValueError("date_from must not be after date_to")
+    return parsed[0], parsed[1]
+
+
+# ======================
+# LOADING
+# ======================
+def load_response_matrix(subject: str, grade: str, date_from=None, date_to=None, chunk_size: int = CHUNK_SIZE):
+    """
+    Load answers into a dense student x question matrix of option codes.
+
+    Records and answers (live + archived) are streamed in chunks (values_list, no model instances);
+    the dense matrix is built once at the end with a single fancy-index assignment.
+
+    Returns dict with:
+      codes      int32 (students, questions), MISSING where no answer
+      scores     float64 (students,), NaN where auto_correct_score_points is null
+      schools    int32 (students,) index into school_names
+      questions  list of question_number (column order)
+      options    list of answer values (code -> value)
+      school_names list of school names
+    """
+    row_of: dict[int, int] = {}
+    ids: list[int] = []
+    scores: list[float] = []
+    schools: list[int] = []
+    school_index: dict[str, int] = {}
+
+    question_index: dict[str, int] = {}
+    option_index: dict[str, int] = {}
+    rows_parts, cols_parts, codes_parts = [], [], []
+
+    def load_answers(answer_model, training_ids):
+        answers = (
+            answer_model.objects
+            .filter(training_id__in=training_ids)
+            .values_list("training_id", "question_number", "answer_value")
+        )
+        rows, cols, codes = [], [], []
+        for training_id, question, value in answers.iterator(chunk_size=chunk_size):
+            value = _normalize(value)
+            if value is None:
+                continue
+            rows.append(row_of[training_id])
+            cols.append(question_index.setdefault(question, len(question_index)))
+            codes.append(option_index.setdefault(value, len(option_index)))
+        rows_parts.append(np.asarray(rows, dtype=np.int64))
+        cols_parts.append(np.asarray(cols, dtype=np.int64))
+        codes_parts.append(np.asarray(codes, dtype=np.int32))
+
+    # Live and archived records (ids are unique across both), read in one snapshot so
+    # records moved by a concurrent archive run are neither loaded twice nor without answers
+    with consistent_reads():
+        for record_model, answer_model in training_sources(subject, grade, date_from):
+            records = record_model.objects.filter(subject=subject, grade=grade)
+            if date_from:
+                records = records.filter(date__gte=date_from)
+            if date_to:
+                records = records.filter(date__lte=date_to)
+            records = records.order_by("id").values_list("id", "auto_correct_score_points", "school_name")
+
+            pending: list[int] = []
+            for training_id, score, school in records.iterator(chunk_size=chunk_size):
+                row_of[training_id] = len(scores)
+                ids.append(training_id)
+                scores.append(np.nan if score is None else float(score))
+                schools.append(school_index.setdefault(school, len(school_index)))
+                pending.append(training_id)
+                if len(pending) >= chunk_size:
+                    load_answers(answer_model, pending)
+                    pending = []
+            if pending:
+                load_answers(answer_model, pending)
+
+    # Stable, human-friendly column order
+    questions = sorted(question_index, key=_question_sort_key)
+    remap = np.empty(len(question_index), dtype=np.int64)
+    for new_col, q in enumerate(questions):
+        remap[question_index[q]] = new_col
+
+    # Students in id order whatever source they came from, so results (e.g. the 27% cut
+    # among tied scores) do not change when records move to the archive
+    ids_arr = np.asarray(ids, dtype=np.int64)
+    order = np.argsort(ids_arr, kind="stable")
+    new_row = np.empty(order.size, dtype=np.int64)
+    new_row[order] = np.arange(order.size)
+    scores_arr = np.asarray(scores, dtype=np.float64)[order]
+    schools_arr = np.asarray(schools, dtype=np.int32)[order]
+
+    matrix = np.full((len(scores), len(questions)), MISSING, dtype=np.int32)
+    if rows_parts:
+        rows = new_row[np.concatenate(rows_parts)]
+        if rows.size:
+            # Later duplicates (same question twice in one record) win, as in the Excel export
+            matrix[rows, remap[np.concatenate(cols_parts)]] = np.concatenate(codes_parts)
+
+    options = [None] * len(option_index)
+    for value, code in option_index.items():
+        options[code] = value
+    school_names = [None] * len(school_index)
+    for name, idx in school_index.items():
+        school_names[idx] = name
+
+    return {
+        "codes": matrix,
+        "scores": scores_arr,
+        "schools": schools_arr,
+        "questions": questions,
+        "options": options,
+        "school_names": school_names,
+    }
+
+
+# ======================
+# STATISTICS
+# ======================
+def _point_biserial(indicator: np.ndarray, scores: np.ndarray) -> np.ndarray:
+    """
+    Column-wise point-biserial correlation between 0/1 indicator columns (n, k) and scores (n,).
+    NaN where undefined (no variance in indicator or scores).
+    """
+    n = scores.shape[0]
+    if n == 0:
+        return np.full(indicator.shape[1], np.nan)
+    x = indicator.astype(np.float64)
+    mean_s = scores.mean()
+    std_s = scores.std()
+    p = x.mean(axis=0)
+    # cov(x, s) / (std_x * std_s), with std_x = sqrt(p(1-p)) for 0/1 columns
+    cov = (x.T @ scores) / n - p * mean_s
+    denom = np.sqrt(p * (1.0 - p)) * std_s
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = cov / denom
+    r[denom == 0] = np.nan
+    return r
+
+
+def _discrimination_index(correct: np.ndarray, scores: np.ndarray, fraction: float = 0.27) -> np.ndarray:
+    """
+    Classic upper-lower discrimination index: p(upper 27%) - p(lower 27%) per question.
+    """
+    n = scores.shape[0]
+    k = int(round(n * fraction))
+    if k == 0:
+        return np.full(correct.shape[1], np.nan)
+    order = np.argsort(scores, kind="stable")
+    lower = correct[order[:k]].mean(axis=0)
+    upper = correct[order[-k:]].mean(axis=0)
+    return upper - lower
+
+
+def _f(value):
+    # JSON-friendly float (NaN -> None)
+    value = float(value)
+    return None if np.isnan(value) else round(value, 4)
+
+
+def compute_item_statistics(data: dict, answer_key: dict | None = None) -> dict:
+    """
+    Vectorized item statistics over a response matrix from load_response_matrix().
+
+    Per question: responses, omitted, option frequencies with per-option point-biserial.
+    With an answer_key ({question_number: correct value}): p_value (proportion correct),
+    point_biserial of the correct option and upper-lower discrimination_index.
+    Distractor (option) counts are also broken down by school.
+    """
+    codes = data["codes"]
+    scores = data["scores"]
+    questions = data["questions"]
+    options = data["options"]
+    n_students, n_questions = codes.shape
+    n_options = len(options)
+
+    answered = codes != MISSING
+    responses = answered.sum(axis=0)
+
+    # Only (question, option) pairs that actually occur are materialized: answers are
+    # free text, so a dense questions x options (or students x pairs) array can be huge.
+    q_idx = np.broadcast_to(np.arange(n_questions, dtype=np.int64), codes.shape)
+    flat = q_idx[answered] * n_options + codes[answered]
+    pairs, pair_of_answer, option_counts = np.unique(flat, return_inverse=True, return_counts=True)
+    pair_q = pairs // n_options
+    pair_o = pairs % n_options
+
+    # Discrimination uses only students with a total score
+    scored = ~np.isnan(scores)
+    scored_scores = scores[scored]
+
+    # Per-option point-biserial (option chosen vs total score) from per-pair score sums:
+    # r = (sum/n - p * mean) / (sqrt(p * (1 - p)) * std), p = count/n over scored students
+    n_scored = scored_scores.size
+    answer_scores = np.broadcast_to(scores[:, None], codes.shape)[answered]
+    answer_scored = ~np.isnan(answer_scores)
+    pair_scored = pair_of_answer[answer_scored]
+    scored_counts = np.bincount(pair_scored, minlength=pairs.size)
+    scored_sums = np.bincount(pair_scored, weights=answer_scores[answer_scored], minlength=pairs.size)
+    if n_scored:
+        p = scored_counts / n_scored
+        denom = np.sqrt(p * (1.0 - p)) * scored_scores.std()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            option_rpb = (scored_sums / n_scored - p * scored_scores.mean()) / denom
+        option_rpb[denom == 0] = np.nan
+    else:
+        option_rpb = np.full(pairs.size, np.nan)
+
+    # Distractor counts by school over occurring (school, question, option) triples only
+    school_names = data["school_names"]
+    s_idx = np.broadcast_to(data["schools"][:, None].astype(np.int64), codes.shape)
+    school_triples, school_counts = np.unique(s_idx[answered] * pairs.size + pair_of_answer, return_counts=True)
+
+    # Keyed statistics
+    p_values = rpb_correct = disc_index = None
+    if answer_key:
+        # Compare like the scoring engine (trimmed, case-insensitive):
+        # key_match[question, option] is True when that option is the correct answer
+        normalized_options = np.array([normalize_answer(v) for v in options] + [""], dtype=object)
+        key_values = np.array(
+            [normalize_answer(answer_key.get(q)) for q in questions], dtype=object
+        )
+        has_key = key_values != ""
+        key_match = (normalized_options[None, :] == key_values[:, None]) & has_key[:, None]
+        # Omitted answers (MISSING) map to the extra "" column, which never matches
+        correct = np.take_along_axis(key_match, np.where(answered, codes, n_options).T, axis=1).T
+        if n_students:
+            p_values = correct.mean(axis=0)
+        else:
+            p_values = np.full(n_questions, np.nan)
+        scored_correct = correct[scored]
+        rpb_correct = _point_biserial(scored_correct, scored_scores)
+        disc_index = _discrimination_index(scored_correct, scored_scores)
+        p_values[~has_key] = np.nan
+        rpb_correct[~has_key] = np.nan
+        disc_index[~has_key] = np.nan
+
+    # pairs are sorted by question, so each question's options are one contiguous slice
+    starts = np.searchsorted(pair_q, np.arange(n_questions + 1))
+
+    items = []
+    for j, question in enumerate(questions):
+        opts = {}
+        for k in range(starts[j], starts[j + 1]):
+            count = int(option_counts[k])
+            opts[options[pair_o[k]]] = {
+                "count": count,
+                "proportion": _f(count / responses[j]) if responses[j] else None,
+                "point_biserial": _f(option_rpb[k]),
+            }
+        item = {
+            "question_number": question,
+            "responses": int(responses[j]),
+            "omitted": int(n_students - responses[j]),
+            "options": opts,
+        }
+        if answer_key:
+            item["correct_answer"] = _normalize(answer_key.get(question))
+            item["p_value"] = _f(p_values[j])
+            item["point_biserial"] = _f(rpb_correct[j])
+            item["discrimination_index"] = _f(disc_index[j])
+        items.append(item)
+
+    distractors_by_school = {school: {} for school in school_names}
+    for triple, count in zip(school_triples, school_counts):
+        s, k = divmod(int(triple), pairs.size)
+        per_question = distractors_by_school[school_names[s]].setdefault(questions[pair_q[k]], {})
+        per_question[options[pair_o[k]]] = int(count)
+
+    return {
+        "students": int(n_students),
+        "scored_students": int(scored.sum()),
+        "questions": items,
+        "distractors_by_school": distractors_by_school,
+    }
+
+
+def run_item_analysis(subject: str, grade: str, date_from=None, date_to=None,
+                      answer_key: dict | None = None, use_cache: bool = True) -> dict:
+    """
+    Load + compute, cached per (subject, grade, date range, answer key).
+    Without an explicit answer_key the stored AnswerKey for subject/grade is used.
+    """
+    if answer_key is None:
+        compiled = get_compiled_key(subject, grade)
+        if compiled is not None:
+            answer_key = compiled.to_dict()
+
+    key = cache_key(subject, grade, date_from, date_to, answer_key)
+    if use_cache:
+        result = cache.get(key)
+        if result is not None:
+            return result
+
+    data = load_response_matrix(subject, grade, date_from, date_to)
+    result = {
+        "subject": subject,
+        "grade": grade,
+        "date_from": str(date_from) if date_from else None,
+        "date_to": str(date_to) if date_to else None,
+        **compute_item_statistics(data, answer_key),
+    }
+
+    cache.set(key, result, _cache_timeout())
+    return result
@@ -0,0 +1,111 @@
+import threading
+
+from main_app.models import AnswerKey, AnswerKeyItem
+
+
+def normalize_answer(value) -> str:
+    # Storyline sends free text: compare trimmed + case-insensitive
+    if value is None:
+        return ""
+    return str(value).strip().casefold()
+
+
+class CompiledKey:
+    """
+    Answer key precompiled into a dict lookup: question_number -> (normalized correct value, points).
+    Scoring a submission is then O(questions) with no DB access.
+    """
+
+    __slots__ = ("subject", "grade", "version", "lookup")
+
+    def __init__(self, subject: str, grade: str, version, items):
+        self.subject = subject
+        self.grade = grade
+        self.version = version
+        self.lookup = {
+            question: (normalize_answer(correct), points)
+            for question, correct, points in items
+        }
+
+    def to_dict(self) -> dict:
+        # {question_number: normalized correct value}, e.g. for item analysis
+        return {question: correct for question, (correct, _points) in self.lookup.items()}
+
+    def score(self, answers) -> tuple[int, list]:
+        """
+        answers: iterable of (question_number, answer_value).
+        Returns (total points, [is_correct per answer]); is_correct is None for
+        questions that are not in the key.
+        """
+        lookup = self.lookup
+        total = 0
+        flags = []
+        for question, value in answers:
+            entry = lookup.get(question)
+            if entry is None:
+                flags.append(None)
+                continue
+            correct, points = entry
+            ok = normalize_answer(value) == correct
+            if ok:
+                total += points
+            flags.append(ok)
+        return total, flags
+
+
+# (subject, grade) -> CompiledKey
+_compiled: dict[tuple[str, str], CompiledKey] = {}
+_compiled_lock = threading.Lock()
+
+
+def _compile(answer_key: AnswerKey) -> CompiledKey:
+    items = (
+        AnswerKeyItem.objects
+        .filter(answer_key=answer_key)
+        .values_list("question_number", "correct_value", "points")
+    )
+    return CompiledKey(answer_key.subject, answer_key.grade, answer_key.updated_at, items)
+
+
+def get_compiled_key(subject: str, grade: str) -> CompiledKey | None:
+    """
+    Compiled key for subject/grade, or None if no key exists.
+    Only the key row (id, updated_at) is queried per call; items are recompiled
+    when updated_at changes.
+    """
+    answer_key = (
+        AnswerKey.objects
+        .filter(subject=subject, grade=grade)
+        .only("id", "subject", "grade", "updated_at")
+        .first()
+    )
+    cache_key = (subject, grade)
+    if answer_key is None:
+        _compiled.pop(cache_key, None)
+        return None
+
+    compiled = _compiled.get(cache_key)
+    if compiled is not None and compiled.version == answer_key.updated_at:
+        return compiled
+
+    compiled = _compile(answer_key)
+    with _compiled_lock:
+        _compiled[cache_key] = compiled
+    return compiled
+
+
+def get_all_compiled_keys() -> dict[tuple[str, str], CompiledKey]:
+    """
+    Compile every answer key in a single pass (for bulk re-scoring).
+    """
+    keys = {}
+    by_id = {}
+    for answer_key in AnswerKey.objects.all():
+        compiled = CompiledKey(answer_key.subject, answer_key.grade, answer_key.updated_at, [])
+        keys[(answer_key.subject, answer_key.grade)] = compiled
+        by_id[answer_key.id] = compiled
+
+    items = AnswerKeyItem.objects.values_list("answer_key_id", "question_number", "correct_value", "points")
+    for key_id, question, correct, points in items:
+        by_id[key_id].lookup[question] = (normalize_answer(correct), points)
+    return keys
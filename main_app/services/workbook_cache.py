@@ -0,0 +1,212 @@
+import atexit
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+class CachedWorkbook:
+    """
+    One resident workbook (per school) + bookkeeping for eTag checks and debounced saves.
+    """
+
+    def __init__(self, key: str, workbook, etag: str | None = None):
+        self.key = key
+        self.workbook = workbook
+        self.etag = etag
+        self.size = 0
+        self.dirty = False
+        self.pending_rows: list[dict] = []  # rows not uploaded yet, re-applied on remote conflicts
+        self.last_flush = time.monotonic()
+        self.timer: threading.Timer | None = None
+
+    def cancel_timer(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+
+class WorkbookCache:
+    """
+    In-process LRU cache of loaded openpyxl workbooks keyed by school.
+
+    - Eviction is by approximate memory footprint (cells * bytes_per_cell), not entry count.
+    - Entries carry the remote eTag they were loaded/uploaded with, so callers can
+      drop them when OneDrive has a newer version.
+    - Saves are debounced: mark_dirty() says whether a flush is due now, otherwise it
+      schedules on_due(key) to run once the save interval has elapsed.
+
+    The cache never saves/uploads by itself, and never evicts an entry with pending
+    (dirty) rows, so the budget can be exceeded until the next debounced flush.
+    Pending rows are journaled on disk by the caller (see workbook_journal).
+    """
+
+    def __init__(self, max_bytes: int, save_interval: float, bytes_per_cell: int = 400, on_due=None):
+        self.max_bytes = max_bytes
+        self.save_interval = save_interval
+        self.bytes_per_cell = bytes_per_cell
+        self.on_due = on_due
+        self._entries: "OrderedDict[str, CachedWorkbook]" = OrderedDict()
+        self._total = 0
+        self._lock = threading.Lock()
+
+    # ----------------------
+    # sizing
+    # ----------------------
+    def estimate_size(self, workbook) -> int:
+        cells = 0
+        for ws in workbook.worksheets:
+            cells += (ws.max_row or 0) * (ws.max_column or 0)
+        return cells * self.bytes_per_cell
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total
+
+    # ----------------------
+    # access
+    # ----------------------
+    def get(self, key: str) -> CachedWorkbook | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, workbook, etag: str | None = None) -> CachedWorkbook:
+        """
+        Insert/replace the workbook for key, evicting least recently used entries over budget.
+        """
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                old.cancel_timer()
+                self._total -= old.size
+
+            entry = CachedWorkbook(key, workbook, etag)
+            entry.size = self.estimate_size(workbook)
+            self._entries[key] = entry
+            self._total += entry.size
+            self._evict_locked(keep=key)
+            return entry
+
+    def resize(self, key: str):
+        """
+        Re-estimate the footprint of key after it was modified.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            new_size = self.estimate_size(entry.workbook)
+            self._total += new_size - entry.size
+            entry.size = new_size
+            self._evict_locked(keep=key)
+
+    def discard(self, key: str) -> CachedWorkbook | None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                entry.cancel_timer()
+                self._total -= entry.size
+            return entry
+
+    def dirty_entries(self) -> list[CachedWorkbook]:
+        with self._lock:
+            return [e for e in self._entries.values() if e.dirty]
+
+    def _evict_locked(self, keep: str | None = None):
+        # Only clean entries are evicted: dirty ones hold rows not uploaded yet and
+        # become evictable after their debounced flush (see mark_flushed).
+        for key in list(self._entries):
+            if self._total <= self.max_bytes:
+                break
+            entry = self._entries[key]
+            if key == keep or entry.dirty:
+                continue
+            del self._entries[key]
+            entry.cancel_timer()
+            self._total -= entry.size
+
+    # ----------------------
+    # debounced saves
+    # ----------------------
+    def mark_dirty(self, entry: CachedWorkbook) -> bool:
+        """
+        Mark entry as modified. Returns True if a flush is due now; otherwise a
+        deferred on_due(key) is scheduled (at most one per entry).
+        """
+        entry.dirty = True
+        remaining = self.save_interval - (time.monotonic() - entry.last_flush)
+        if remaining <= 0:
+            entry.cancel_timer()
+            return True
+
+        if entry.timer is None and self.on_due is not None:
+            entry.timer = threading.Timer(remaining, self._fire, args=(entry,))
+            entry.timer.daemon = True
+            entry.timer.start()
+        return False
+
+    def mark_flushed(self, entry: CachedWorkbook, etag: str | None = None):
+        entry.dirty = False
+        entry.pending_rows = []
+        entry.last_flush = time.monotonic()
+        entry.cancel_timer()
+        if etag:
+            entry.etag = etag
+        with self._lock:
+            self._evict_locked()
+
+    def _fire(self, entry: CachedWorkbook):
+        entry.timer = None
+        self.on_due(entry.key)
+
+
+_cache: WorkbookCache | None = None
+_cache_init_lock = threading.Lock()
+
+
+def get_workbook_cache(on_due=None) -> WorkbookCache | None:
+    """
+    Process-wide cache, or None when disabled.
+
+    Env:
+      WORKBOOK_CACHE_ENABLED=True        opt-in
+      WORKBOOK_CACHE_MAX_MB=64           approximate memory budget
+      WORKBOOK_CACHE_SAVE_INTERVAL=30    seconds between saves/uploads of the same workbook
+      WORKBOOK_CACHE_BYTES_PER_CELL=400  footprint estimate per openpyxl cell
+    """
+    global _cache
+    if os.getenv("WORKBOOK_CACHE_ENABLED") != "True":
+        return None
+
+    if _cache is None:
+        with _cache_init_lock:
+            if _cache is None:
+                _cache = WorkbookCache(
+                    max_bytes=_env_int("WORKBOOK_CACHE_MAX_MB", 64) * 1024 * 1024,
+                    save_interval=_env_int("WORKBOOK_CACHE_SAVE_INTERVAL", 30),
+                    bytes_per_cell=_env_int("WORKBOOK_CACHE_BYTES_PER_CELL", 400),
+                    on_due=on_due,
+                )
+                if on_due is not None:
+                    atexit.register(_flush_all_on_exit)
+    return _cache
+
+
+def _flush_all_on_exit():
+    if _cache is None or _cache.on_due is None:
+        return
+    for entry in _cache.dirty_entries():
+        try:
+            _cache.on_due(entry.key)
+        except Exception as e:
+            print(f"[WorkbookCache] Flush on exit failed for {entry.key}: {e}")
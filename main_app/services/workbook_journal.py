@@ -0,0 +1,101 @@
+"""
+On-disk journal of rows appended to cached workbooks but not uploaded yet.
+
+With the workbook cache, rows wait in memory for the debounced upload. Each row is
+also appended here (one file per school and process) before the request returns, so
+rows of a worker that is killed (gunicorn timeout, OOM) are re-applied by the next
+process that loads the school's workbook. The journal is cleared after each upload.
+
+Files: <JOURNAL_DIR>/<school>.<pid>.<n>.jsonl
+"""
+import glob
+import json
+import os
+import time
+
+JOURNAL_DIR = os.getenv("WORKBOOK_JOURNAL_DIR", os.path.join(os.getcwd(), "excel_files", "journal"))
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _files(key: str, pid: str = "*") -> list[str]:
+    return sorted(glob.glob(os.path.join(JOURNAL_DIR, f"{glob.escape(key)}.{pid}.*.jsonl")))
+
+
+def _owner(path: str) -> int | None:
+    try:
+        return int(os.path.basename(path).rsplit(".", 3)[-3])
+    except (ValueError, IndexError):
+        return None
+
+
+def append_rows(key: str, rows: list[dict]):
+    if not rows:
+        return
+    os.makedirs(JOURNAL_DIR, exist_ok=True)
+    path = os.path.join(JOURNAL_DIR, f"{key}.{os.getpid()}.0.jsonl")
+    with open(path, "a", encoding="utf-8") as f:
+        for row in rows:
+            # request.data may be a QueryDict (form posts): keep one value per field
+            f.write(json.dumps(dict(row.items()), ensure_ascii=False, default=str) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def recover_rows(key: str) -> list[dict]:
+    """
+    Take over the journals of dead processes for key (atomic rename to this pid) and
+    return every row journaled for key by this pid. Called when the workbook is loaded,
+    i.e. when this process holds no pending rows for key in memory.
+    """
+    pid = os.getpid()
+    for path in _files(key):
+        owner = _owner(path)
+        if owner is None or owner == pid or _pid_alive(owner):
+            continue
+        target = os.path.join(JOURNAL_DIR, f"{key}.{pid}.{time.time_ns()}.jsonl")
+        try:
+            os.rename(path, target)
+        except FileNotFoundError:
+            continue  # taken over by another process
+
+    rows = []
+    for path in _files(key, str(pid)):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    print(f"[WorkbookJournal] Skipping a truncated line in {os.path.basename(path)}")
+    return rows
+
+
+def clear(key: str):
+    # Rows are on OneDrive now
+    for path in _files(key, str(os.getpid())):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def orphaned_keys() -> list[str]:
+    """
+    Schools with journals left by dead processes (recovered at worker start).
+    """
+    keys = set()
+    for path in glob.glob(os.path.join(JOURNAL_DIR, "*.jsonl")):
+        owner = _owner(path)
+        if owner is not None and owner != os.getpid() and not _pid_alive(owner):
+            keys.add(os.path.basename(path).rsplit(".", 3)[0])
+    return sorted(keys)
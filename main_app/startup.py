@@ -0,0 +1,126 @@
+"""
+Cold-start helpers (Render spins the service down when idle).
+
+- warm_imports(): import the heavy, lazily-loaded modules (openpyxl, requests)
+  before the first request. Called from wsgi.py, so with gunicorn preload_app it runs
+  once in the master and every forked worker inherits the loaded modules.
+- warm_worker(): per-worker warmup (gunicorn post_worker_init): optional DB connection,
+  replay of spooled submissions left by earlier workers, plus background pre-warming of
+  the Graph token and hot workbooks.
+"""
+import importlib
+import os
+import threading
+import time
+
+# Modules kept off the URLconf import path (see views.py) and loaded here instead
+# (item_analysis/numpy is left out: it only serves a rare admin report)
+HEAVY_MODULES = [
+    "main_app.excel_utils",  # openpyxl + requests (Graph client)
+]
+
+
+def _enabled(name: str, default: str = "False") -> bool:
+    return os.getenv(name, default) == "True"
+
+
+def warm_imports() -> dict[str, float]:
+    """
+    Import HEAVY_MODULES. Returns seconds spent per module.
+    Disable with WARMUP_IMPORTS=False.
+    """
+    timings = {}
+    if not _enabled("WARMUP_IMPORTS", "True"):
+        return timings
+
+    for name in HEAVY_MODULES:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            print(f"[Warmup] Import of {name} failed: {e}")
+            continue
+        timings[name] = time.perf_counter() - start
+    return timings
+
+
+def warm_db_connection():
+    # Sync gunicorn workers serve requests on this same thread, so the
+    # persistent connection (conn_max_age) is reused by the first request.
+    from django.db import connection
+
+    try:
+        connection.ensure_connection()
+    except Exception as e:
+        print(f"[Warmup] DB connection failed: {e}")
+
+
+def prewarm_graph_token():
+    from main_app.services.graph_upload_session import GraphUploadSessionClient
+
+    GraphUploadSessionClient().get_app_token()
+
+
+def prewarm_workbooks(school_names: list[str]):
+    from main_app.excel_utils import prewarm_workbook
+
+    for school_name in school_names:
+        if prewarm_workbook(school_name):
+            print(f"[Warmup] Workbook loaded: {school_name}")
+
+
+def replay_db_spool():
+    # Spool files of workers that were restarted/killed are only replayed when triggered
+    from main_app.services.db_circuit import replay_spool_in_background
+
+    try:
+        replay_spool_in_background()
+    except Exception as e:
+        print(f"[Warmup] DB spool replay failed to start: {e}")
+
+
+def recover_workbook_journals():
+    from main_app.excel_utils import recover_journaled_workbooks
+
+    recovered = recover_journaled_workbooks()
+    if recovered:
+        print(f"[Warmup] Recovered journaled rows of {recovered} workbooks")
+
+
+def _background_prewarm(school_names: list[str]):
+    try:
+        if _enabled("WORKBOOK_CACHE_ENABLED"):
+            # Rows of killed workers that never reached OneDrive
+            recover_workbook_journals()
+        if _enabled("WARMUP_GRAPH_TOKEN"):
+            prewarm_graph_token()
+        if school_names:
+            prewarm_workbooks(school_names)
+    except Exception as e:
+        print(f"[Warmup] Background pre-warm failed: {e}")
+
+
+def warm_worker():
+    """
+    Env:
+      WARMUP_DB=True             open the DB connection before the first request
+      WARMUP_SPOOL_REPLAY=False  skip replaying spooled submissions at worker start
+      WARMUP_GRAPH_TOKEN=True    fetch the Graph app token in the background
+      WARMUP_SCHOOLS=A,B         load these schools' workbooks in the background
+                                 (needs WORKBOOK_CACHE_ENABLED=True)
+    With WORKBOOK_CACHE_ENABLED=True, rows journaled by killed workers are re-applied
+    and uploaded in the background.
+    """
+    if _enabled("WARMUP_DB"):
+        warm_db_connection()
+
+    if _enabled("WARMUP_SPOOL_REPLAY", "True"):
+        # Threads do not survive fork either: started per worker
+        replay_db_spool()
+
+    school_names = [s.strip() for s in os.getenv("WARMUP_SCHOOLS", "").split(",") if s.strip()]
+    if _enabled("WARMUP_GRAPH_TOKEN") or _enabled("WORKBOOK_CACHE_ENABLED") or school_names:
+        # Threads do not survive fork, so this must run in the worker (not at preload)
+        threading.Thread(
+            target=_background_prewarm, args=(school_names,), name="prewarm", daemon=True
+        ).start()
@@ -1,3 +1,543 @@
-from django.test import TestCase
+import datetime
+import gzip
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import openpyxl
+import requests
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from main_app import excel_utils, parsers
+from main_app.models import (
+    TrainingRecord, TrainingAnswer, AnswerKey, AnswerKeyItem, ArchivedTrainingRecord, ArchivedTrainingAnswer,
+)
+from main_app.serializers import bulk_create_trainings
+from main_app.services import db_circuit, workbook_journal
+from main_app.services.workbook_cache import WorkbookCache
+from main_app.services.archive import ARCHIVE, LIVE, archive_batch, training_sources
+from main_app.services.columnar import ColumnarBatchError, decode_batch
+from main_app.services.scoring import CompiledKey, get_compiled_key
+from main_app.services.item_analysis import (
+    MISSING, compute_item_statistics, parse_date_range, run_item_analysis,
+)
+
+
+class ItemAnalysisTests(TestCase):
+    def _data(self):
+        # 4 students x 2 questions, options: 0="A", 1="B", 2="C"
+        return {
+            "codes": np.array([[0, 1], [0, 0], [1, MISSING], [2, 0]], dtype=np.int32),
+            "scores": np.array([10.0, 8.0, 2.0, np.nan]),
+            "schools": np.array([0, 0, 1, 1], dtype=np.int32),
+            "questions": ["Q1", "Q2"],
+            "options": ["A", "B", "C"],
+            "school_names": ["S1", "S2"],
+        }
+
+    def test_option_counts_and_distractors_by_school(self):
+        result = compute_item_statistics(self._data())
+        q1, q2 = result["questions"]
+        self.assertEqual({k: v["count"] for k, v in q1["options"].items()}, {"A": 2, "B": 1, "C": 1})
+        self.assertEqual(q2["omitted"], 1)
+        self.assertEqual(result["distractors_by_school"]["S2"], {"Q1": {"B": 1, "C": 1}, "Q2": {"A": 1}})
+
+    def test_option_point_biserial_matches_dense_formula(self):
+        data = self._data()
+        result = compute_item_statistics(data)
+        scored = ~np.isnan(data["scores"])
+        chosen = (data["codes"][scored, 0] == 0).astype(float)
+        expected = np.corrcoef(chosen, data["scores"][scored])[0, 1]
+        self.assertAlmostEqual(result["questions"][0]["options"]["A"]["point_biserial"], round(expected, 4))
+
+    def test_keyed_statistics(self):
+        result = compute_item_statistics(self._data(), answer_key={"Q1": "a"})
+        q1, q2 = result["questions"]
+        self.assertEqual(q1["p_value"], 0.5)
+        self.assertIsNone(q2["p_value"])
+
+    def test_parse_date_range(self):
+        self.assertEqual(str(parse_date_range("2025-3-1", None)[0]), "2025-03-01")
+        for bad in ("garbage", "2025-02-30"):
+            with self.assertRaises(ValueError):
+                parse_date_range(bad, None)
+        with self.assertRaises(ValueError):
+            parse_date_range("2025-05-01", "2025-01-01")
+
+    def test_endpoint_is_staff_only(self):
+        url = "/api/item-analysis/?subject=Math&grade=4&refresh=1"
+        self.assertIn(self.client.get(url, HTTP_HOST="localhost").status_code, (401, 403))
+        self.client.force_login(User.objects.create_user("teacher"))
+        self.assertEqual(self.client.get(url, HTTP_HOST="localhost").status_code, 403)
+        self.client.force_login(User.objects.create_user("admin", is_staff=True))
+        self.assertEqual(self.client.get(url, HTTP_HOST="localhost").status_code, 200)
+
+    def test_endpoint_rejects_bad_dates(self):
+        self.client.force_login(User.objects.create_user("admin", is_staff=True))
+        response = self.client.get(
+            "/api/item-analysis/?subject=Math&grade=4&date_from=garbage", HTTP_HOST="localhost"
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_run_from_db(self):
+        record = TrainingRecord.objects.create(subject="Math", grade="4", auto_correct_score_points=5)
+        TrainingAnswer.objects.create(training=record, question_number="Q1", answer_value=" A ")
+        result = run_item_analysis("Math", "4", use_cache=False)
+        self.assertEqual(result["students"], 1)
+        self.assertEqual(list(result["questions"][0]["options"]), ["A"])
+
+
+def _make_key(subject="Math", grade="4", items=(("Q1", "A", 1), ("Q2", "b", 2))):
+    key = AnswerKey.objects.create(subject=subject, grade=grade)
+    for question, correct, points in items:
+        AnswerKeyItem.objects.create(answer_key=key, question_number=question, correct_value=correct, points=points)
+    return key
+
+
+class ScoringTests(TestCase):
+    def test_compiled_key_score(self):
+        key = CompiledKey("Math", "4", None, [("Q1", "A", 1), ("Q2", " b ", 2)])
+        total, flags = key.score([("Q1", " a"), ("Q2", "B"), ("Q3", "x"), ("Q1", None)])
+        self.assertEqual(total, 3)
+        self.assertEqual(flags, [True, True, None, False])
+
+    def test_compiled_key_rebuilt_when_key_changes(self):
+        key = _make_key()
+        first = get_compiled_key("Math", "4")
+        self.assertIs(get_compiled_key("Math", "4"), first)
+
+        item = key.items.get(question_number="Q1")
+        item.correct_value = "C"
+        item.save()
+        second = get_compiled_key("Math", "4")
+        self.assertIsNot(second, first)
+        self.assertEqual(second.score([("Q1", "C")])[0], 1)
+
+        item.delete()
+        self.assertNotIn("Q1", get_compiled_key("Math", "4").lookup)
+
+        key.delete()
+        self.assertIsNone(get_compiled_key("Math", "4"))
+
+    def test_bulk_create_scores_with_one_key_lookup_per_subject_grade(self):
+        _make_key()
+        rows = [
+            {"subject": "Math", "grade": "4", "answers": [{"question_number": "Q1", "answer_value": "A"}]}
+            for _ in range(20)
+        ]
+        # key row + items once, then savepoint, record insert, answer insert, release
+        with self.assertNumQueries(6):
+            trainings = bulk_create_trainings(rows)
+        self.assertEqual(len(trainings), 20)
+        self.assertTrue(all(t.server_score_points == 1 for t in trainings))
+        self.assertEqual(TrainingAnswer.objects.filter(is_correct=True).count(), 20)
+
+
+class RescoreCommandTests(TransactionTestCase):
+    def test_rescore_after_key_correction(self):
+        records = []
+        for value in ("A", "C"):
+            record = TrainingRecord.objects.create(subject="Math", grade="4")
+            TrainingAnswer.objects.create(training=record, question_number="Q1", answer_value=value)
+            records.append(record)
+        other = TrainingRecord.objects.create(subject="Science", grade="4")
+
+        key = _make_key(items=(("Q1", "A", 1),))
+        # One worker: in-memory SQLite test DBs lock on concurrent writers (use Postgres for more)
+        call_command("rescore_training", workers=1, batch_size=1, stdout=io.StringIO())
+        self.assertEqual([TrainingRecord.objects.get(pk=r.pk).server_score_points for r in records], [1, 0])
+
+        # Key corrected: C is the right answer
+        AnswerKeyItem.objects.filter(answer_key=key).update(correct_value="C")
+        call_command("rescore_training", workers=1, batch_size=1, stdout=io.StringIO())
+        self.assertEqual([TrainingRecord.objects.get(pk=r.pk).server_score_points for r in records], [0, 1])
+        self.assertEqual(
+            list(TrainingAnswer.objects.order_by("training_id").values_list("is_correct", flat=True)),
+            [False, True],
+        )
+        self.assertIsNone(TrainingRecord.objects.get(pk=other.pk).server_score_points)
+
+    def test_records_archived_during_rescore_are_rescored_in_the_archive(self):
+        from main_app.management.commands import rescore_training
+
+        record = TrainingRecord.objects.create(subject="Math", grade="4")
+        TrainingAnswer.objects.create(training=record, question_number="Q1", answer_value="A")
+        _make_key(items=(("Q1", "A", 1),))
+
+        original = rescore_training._rescore_batch
+
+        def archive_first(source, *args):
+            # archive_training moves the record after it was listed as live
+            if source is LIVE:
+                archive_batch(timezone.now(), batch_size=10)
+            return original(source, *args)
+
+        with mock.patch.object(rescore_training, "_rescore_batch", side_effect=archive_first):
+            call_command("rescore_training", workers=1, skip_archive=True, stdout=io.StringIO())
+
+        archived = ArchivedTrainingRecord.objects.get(pk=record.pk)
+        self.assertEqual(archived.server_score_points, 1)
+        self.assertEqual(list(archived.answers.values_list("is_correct", flat=True)), [True])
+
+
+class DbCircuitTests(TestCase):
+    def test_half_open_probe_resolved_by_any_error(self):
+        breaker = db_circuit.CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_result(OperationalError("down"))
+        self.assertEqual(breaker.state, breaker.OPEN)
+
+        self.assertTrue(breaker.allow_request())  # the probe
+        self.assertFalse(breaker.allow_request())
+        breaker.record_result(IntegrityError("bad row"))  # DB answered
+        self.assertEqual(breaker.state, breaker.CLOSED)
+
+    def test_replay_reclaims_claims_of_dead_processes(self):
+        dead = subprocess.Popen([sys.executable, "-c", "pass"])
+        dead.wait()
+        with tempfile.TemporaryDirectory() as spool_dir, mock.patch.object(db_circuit, "SPOOL_DIR", spool_dir):
+            db_circuit.spool_payload({"subject": "Math", "grade": "4", "student_name": "A", "answers": []})
+            path = db_circuit._spool_path()
+            os.rename(path, f"{path}.{dead.pid}.1.claimed")
+            live_claim = f"{path}.{os.getpid()}.2.claimed"
+            open(live_claim, "w").close()
+
+            self.assertTrue(db_circuit.spool_pending())
+            self.assertEqual(db_circuit.replay_spool(), 1)
+            self.assertEqual(os.listdir(spool_dir), [os.path.basename(live_claim)])
+        self.assertTrue(TrainingRecord.objects.filter(student_name="A").exists())
+
+    def _spool_dir(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.object(db_circuit, "SPOOL_DIR", tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        db_circuit.spool_payload({"subject": "Math", "grade": "4", "student_name": "A", "answers": []})
+        return tmp.name
+
+    def test_connection_errors_put_the_file_back_under_its_base_name(self):
+        spool_dir = self._spool_dir()
+        with mock.patch("main_app.serializers.bulk_create_trainings", side_effect=OperationalError("down")):
+            for _ in range(3):
+                self.assertEqual(db_circuit.replay_spool(), 0)
+        [name] = os.listdir(spool_dir)
+        self.assertRegex(name, rf"^spool-{os.getpid()}-\d+\.jsonl$")
+
+    def test_other_errors_quarantine_the_file(self):
+        spool_dir = self._spool_dir()
+        with mock.patch("main_app.serializers.bulk_create_trainings", side_effect=ValueError("bug")):
+            self.assertEqual(db_circuit.replay_spool(), 0)
+        [name] = os.listdir(spool_dir)
+        self.assertTrue(name.endswith(".jsonl.failed"))
+        self.assertFalse(db_circuit.spool_pending())
+
+
+class ColumnarBatchTests(TestCase):
+    def _batch(self, **overrides):
+        batch = {
+            "header": {"subject": "Math", "grade": "4", "school_name": "S1"},
+            "columns": {"student_name": ["A", "B"]},
+            "questions": ["Q1", "Q2"],
+            "answers": [[" a ", 3], ["B", None]],
+        }
+        batch.update(overrides)
+        return batch
+
+    def test_answer_cells_validated_like_single_submissions(self):
+        raw, validated, errors = decode_batch(self._batch())
+        self.assertEqual(errors, {})
+        self.assertEqual(
+            [a["answer_value"] for a in validated[0]["answers"]], ["a", "3"]
+        )
+        self.assertEqual(raw[0]["answers"][0]["answer_value"], " a ")
+
+        _raw, validated, errors = decode_batch(self._batch(answers=[["x\x00", "A"], [{"a": 1}, "B"]]))
+        self.assertEqual(validated, [])
+        self.assertEqual(set(errors[0]["answers"]), {"Q1"})
+        self.assertEqual(set(errors[1]["answers"]), {"Q1"})
+
+    def test_non_string_questions_are_structural_errors(self):
+        for questions in ([["Q1"], "Q2"], [{"q": 1}, "Q2"], [1, "Q2"]):
+            with self.assertRaises(ColumnarBatchError):
+                decode_batch(self._batch(questions=questions))
+
+    def test_endpoint_returns_400_for_unhashable_question(self):
+        response = self.client.post(
+            "/api/submit-training/batch/", self._batch(questions=[["Q1"], "Q2"]),
+            content_type="application/json", HTTP_HOST="localhost",
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class ArchiveTests(TestCase):
+    def _record(self, name, score, created_days_ago, answers, date=datetime.date(2025, 3, 1)):
+        record = TrainingRecord.objects.create(
+            subject="Math", grade="4", student_name=name, school_name="S1",
+            auto_correct_score_points=score, date=date,
+        )
+        TrainingRecord.objects.filter(id=record.id).update(
+            created_at=timezone.now() - datetime.timedelta(days=created_days_ago)
+        )
+        for question, value in answers.items():
+            TrainingAnswer.objects.create(training=record, question_number=question, answer_value=value)
+        return record
+
+    def test_archive_batch_moves_records_with_their_ids(self):
+        old = self._record("old", 5, 400, {"Q1": "A", "Q2": "B"})
+        new = self._record("new", 7, 1, {"Q1": "C"})
+        cutoff = timezone.now() - datetime.timedelta(days=30)
+
+        self.assertEqual(archive_batch(cutoff, batch_size=10), (1, 2))
+        self.assertEqual(archive_batch(cutoff, batch_size=10), (0, 0))
+        self.assertEqual(list(TrainingRecord.objects.values_list("id", flat=True)), [new.id])
+        archived = ArchivedTrainingRecord.objects.get()
+        self.assertEqual((archived.id, archived.student_name), (old.id, "old"))
+        self.assertEqual(ArchivedTrainingAnswer.objects.filter(training=archived).count(), 2)
+        self.assertFalse(TrainingAnswer.objects.filter(training_id=old.id).exists())
+
+    def test_training_sources_skips_archive_after_newest_archived_date(self):
+        self._record("old", 5, 400, {"Q1": "A"}, date=datetime.date(2025, 3, 9))
+        archive_batch(timezone.now(), batch_size=10)
+
+        self.assertEqual(training_sources("Math", "4"), [LIVE, ARCHIVE])
+        # Compared as dates, not strings ("2025-3-10" < "2025-03-09" as text)
+        self.assertEqual(training_sources("Math", "4", "2025-3-10"), [LIVE])
+        self.assertEqual(training_sources("Math", "4", datetime.date(2025, 3, 9)), [LIVE, ARCHIVE])
+        self.assertEqual(training_sources("Math", "4", "2025-03-01"), [LIVE, ARCHIVE])
+        with self.assertRaises(ValueError):
+            training_sources("Math", "4", "garbage")
+
+    def test_item_analysis_unchanged_by_archiving(self):
+        # Tied scores around the 27% cut: results must not depend on which table a row is in
+        answers = [("A", "B"), ("B", "B"), ("A", "A"), ("C", "B"), ("A", "B"), ("B", "A"), ("A", "B")]
+        for i, (q1, q2) in enumerate(answers):
+            self._record(f"s{i}", 5 if i < 4 else 9, 400 if i % 2 else 1, {"Q1": q1, "Q2": q2})
+        key = {"Q1": "A", "Q2": "B"}
+        before = run_item_analysis("Math", "4", answer_key=key, use_cache=False)
+
+        while archive_batch(timezone.now() - datetime.timedelta(days=30), batch_size=2)[0]:
+            pass
+        self.assertEqual(ArchivedTrainingRecord.objects.count(), 3)
+        after = run_item_analysis("Math", "4", answer_key=key, use_cache=False)
+        self.assertEqual(after, before)
+
+
+class FakeGraphClient:
+    """OneDrive stand-in: one workbook per path, eTag bumped on every upload."""
+
+    def __init__(self):
+        self.files = {}  # remote_filename -> (bytes, etag)
+        self.uploads = 0
+        self.fail_downloads = False
+        self.on_upload = None  # hook to simulate a concurrent writer
+
+    def put_rows(self, remote_filename, rows):
+        wb = excel_utils._new_workbook()
+        if remote_filename in self.files:
+            wb = openpyxl.load_workbook(io.BytesIO(self.files[remote_filename][0]))
+        excel_utils._append_submissions(wb, rows)
+        out = io.BytesIO()
+        wb.save(out)
+        etag = f"v{len(self.files) + self.uploads + len(rows)}-{os.urandom(2).hex()}"
+        self.files[remote_filename] = (out.getvalue(), etag)
+
+    def rows(self, remote_filename):
+        wb = openpyxl.load_workbook(io.BytesIO(self.files[remote_filename][0]))
+        return [r[2] for r in wb["Math"].iter_rows(min_row=2, values_only=True)]
+
+    def download_file(self, remote_folder, remote_filename, local_path):
+        if self.fail_downloads:
+            raise requests.ConnectionError("download failed")
+        if remote_filename not in self.files:
+            return False
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        with open(local_path, "wb") as f:
+            f.write(self.files[remote_filename][0])
+        return True
+
+    def get_item_etag(self, remote_folder, remote_filename):
+        return self.files.get(remote_filename, (None, None))[1]
+
+    def upload_large_file(self, local_path, remote_folder, remote_filename, chunk_size_mb=10,
+                          max_retries=1, if_match=None):
+        if self.on_upload is not None:
+            hook, self.on_upload = self.on_upload, None
+            hook()
+        current = self.get_item_etag(remote_folder, remote_filename)
+        if if_match and if_match != current:
+            response = requests.Response()
+            response.status_code = 412
+            raise requests.HTTPError("412 Precondition Failed", response=response)
+        self.uploads += 1
+        with open(local_path, "rb") as f:
+            self.files[remote_filename] = (f.read(), f"up{self.uploads}")
+        return {"eTag": f"up{self.uploads}"}
+
+
+def _row(name):
+    return {"school_name": "S1", "subject": "Math", "student_name": name, "answers": []}
+
+
+class WorkbookCacheTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.client_ = FakeGraphClient()
+        for patcher in (
+            mock.patch.object(excel_utils, "EXCEL_DIR", tmp.name),
+            mock.patch.object(workbook_journal, "JOURNAL_DIR", os.path.join(tmp.name, "journal")),
+            mock.patch.object(excel_utils, "GraphUploadSessionClient", lambda: self.client_),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_budget_eviction_never_evicts_dirty_entries(self):
+        # A fresh openpyxl workbook is one sheet x one cell = 100 bytes here
+        cache = WorkbookCache(max_bytes=250, save_interval=3600, bytes_per_cell=100)
+        a = cache.put("a", openpyxl.Workbook())
+        cache.mark_dirty(a)
+        cache.put("b", openpyxl.Workbook())
+        cache.put("c", openpyxl.Workbook())
+        # Over budget: b (least recently used clean entry) goes, the older dirty a stays
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.total_bytes, 200)
+
+        cache.mark_flushed(a)
+        cache.get("c")
+        cache.put("d", openpyxl.Workbook())
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.total_bytes, 200)
+
+    def test_debounced_flush_scheduling(self):
+        fired = threading.Event()
+        cache = WorkbookCache(max_bytes=10**6, save_interval=0.05, on_due=lambda key: fired.set())
+        entry = cache.put("a", excel_utils._new_workbook())
+        self.assertFalse(cache.mark_dirty(entry))  # saved just now: deferred
+        timer = entry.timer
+        self.assertFalse(cache.mark_dirty(entry))
+        self.assertIs(entry.timer, timer)  # one timer per entry
+        self.assertTrue(fired.wait(2))
+        self.assertTrue(cache.mark_dirty(entry))  # interval elapsed: due now
+
+    def _cached_school(self, save_interval=3600):
+        self.client_.put_rows("S1.xlsx", [_row(f"old{i}") for i in range(50)])
+        cache = WorkbookCache(max_bytes=10**8, save_interval=save_interval)
+        excel_utils._save_to_excel_cached(cache, [_row("first")], "S1")
+        return cache, cache.get("S1")
+
+    def test_flush_reapplies_pending_rows_on_remote_change(self):
+        cache, entry = self._cached_school()
+        self.client_.put_rows("S1.xlsx", [_row("edited-on-onedrive")])
+        excel_utils._save_to_excel_cached(cache, [_row("second")], "S1")
+
+        excel_utils._flush_entry(self.client_, cache, entry, "S1")
+        rows = self.client_.rows("S1.xlsx")
+        self.assertEqual(len(rows), 53)
+        self.assertEqual(rows[-3:], ["edited-on-onedrive", "first", "second"])
+        self.assertFalse(entry.dirty)
+
+    def test_failed_reload_keeps_rows_and_remote_file(self):
+        cache, entry = self._cached_school()
+        self.client_.put_rows("S1.xlsx", [_row("edited-on-onedrive")])
+        remote_before = self.client_.files["S1.xlsx"]
+        self.client_.fail_downloads = True
+
+        excel_utils._flush_entry(self.client_, cache, entry, "S1")
+        self.assertEqual(self.client_.files["S1.xlsx"], remote_before)
+        self.assertEqual(self.client_.uploads, 0)
+        self.assertTrue(entry.dirty)
+        self.assertEqual([r["student_name"] for r in entry.pending_rows], ["first"])
+
+    def test_upload_is_conditional_on_etag(self):
+        cache, entry = self._cached_school()
+        # Another writer uploads between our eTag check and our upload
+        self.client_.on_upload = lambda: self.client_.put_rows("S1.xlsx", [_row("racer")])
+
+        excel_utils._flush_entry(self.client_, cache, entry, "S1")
+        self.assertEqual(self.client_.rows("S1.xlsx")[-2:], ["racer", "first"])
+        self.assertFalse(entry.dirty)
+
+    def test_rows_of_a_dead_process_are_recovered_from_the_journal(self):
+        self.client_.put_rows("S1.xlsx", [_row("old")])
+        dead = subprocess.Popen([sys.executable, "-c", "pass"])
+        dead.wait()
+        os.makedirs(workbook_journal.JOURNAL_DIR)
+        with open(os.path.join(workbook_journal.JOURNAL_DIR, f"S1.{dead.pid}.0.jsonl"), "w") as f:
+            f.write('{"school_name": "S1", "subject": "Math", "student_name": "lost", "answers": []}\n')
+
+        cache = WorkbookCache(max_bytes=10**8, save_interval=0)
+        excel_utils._save_to_excel_cached(cache, [_row("new")], "S1")
+        self.assertEqual(self.client_.rows("S1.xlsx"), ["old", "lost", "new"])
+        self.assertEqual(os.listdir(workbook_journal.JOURNAL_DIR), [])
+
+
+class GzipSubmissionTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.graph = FakeGraphClient()
+        for patcher in (
+            mock.patch.dict(os.environ, {"WORKBOOK_CACHE_ENABLED": "False"}),
+            mock.patch.object(excel_utils, "EXCEL_DIR", tmp.name),
+            mock.patch.object(excel_utils, "GraphUploadSessionClient", lambda: self.graph),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _post(self, url, body, encoding="gzip"):
+        return self.client.post(
+            url, body, content_type="application/json", HTTP_CONTENT_ENCODING=encoding, HTTP_HOST="localhost",
+        )
+
+    def _batch(self):
+        return {
+            "header": {"subject": "Math", "grade": "4"},
+            "columns": {"student_name": ["A", "B", "C"], "school_name": ["S1", "S2", "S1"]},
+            "questions": ["Q1"],
+            "answers": [["A"], ["B"], ["C"]],
+        }
+
+    def test_gzip_single_submission(self):
+        payload = {"subject": "Math", "grade": "4", "school_name": "S1", "student_name": "A",
+                   "answers": [{"question_number": "Q1", "answer_value": "A"}]}
+        response = self._post("/api/submit-training/", gzip.compress(json.dumps(payload).encode()))
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertTrue(TrainingRecord.objects.filter(student_name="A", school_name="S1").exists())
+
+    def test_gzip_columnar_batch_saves_once_per_school(self):
+        with mock.patch("main_app.views.bulk_create_trainings", wraps=bulk_create_trainings) as bulk:
+            response = self._post("/api/submit-training/batch/", gzip.compress(json.dumps(self._batch()).encode()))
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()["db_saved_count"], 3)
+        bulk.assert_called_once()
+        self.assertEqual(self.graph.uploads, 2)  # one save/upload per school
+        self.assertEqual(self.graph.rows("S1.xlsx"), ["A", "C"])
+        self.assertEqual(self.graph.rows("S2.xlsx"), ["B"])
+
+    def test_invalid_gzip_body(self):
+        response = self._post("/api/submit-training/batch/", json.dumps(self._batch()).encode())
+        self.assertEqual(response.status_code, 400)
+
+    def test_unsupported_encoding(self):
+        response = self._post("/api/submit-training/batch/", json.dumps(self._batch()).encode(), encoding="br")
+        self.assertEqual(response.status_code, 400)
+
+    def test_decompressed_size_cap(self):
+        body = gzip.compress(json.dumps(self._batch()).encode())
+        with mock.patch.object(parsers, "MAX_DECOMPRESSED_BYTES", 64):
+            response = self._post("/api/submit-training/batch/", body)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("too large", response.json()["detail"])
+        with mock.patch.dict(os.environ, {"MAX_DECOMPRESSED_BODY_MB": "10MB"}):
+            self.assertEqual(parsers._env_int("MAX_DECOMPRESSED_BODY_MB", 10), 10)
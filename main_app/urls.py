@@ -1,10 +1,12 @@
 from django.urls import path
 from .views import SubmitTrainingAPIView
-from .views import SubmitTrainingAPIView, azure_callback
+from .views import SubmitTrainingAPIView, SubmitTrainingBatchAPIView, ItemAnalysisAPIView, azure_callback
 
 
 
 urlpatterns = [
     path('api/submit-training/', SubmitTrainingAPIView.as_view(), name='submit-training'),
+    path('api/submit-training/batch/', SubmitTrainingBatchAPIView.as_view(), name='submit-training-batch'),
+    path('api/item-analysis/', ItemAnalysisAPIView.as_view(), name='item-analysis'),
     path("auth/callback", azure_callback),  
 ]
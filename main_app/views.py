@@ -3,35 +3,75 @@ from django.http import HttpResponse
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.permissions import IsAdminUser
 
-from .serializers import TrainingRecordSerializer
-from .excel_utils import save_to_excel
+from .parsers import GzipJSONParser
+from .serializers import TrainingRecordSerializer, bulk_create_trainings
+from .services.db_circuit import (
+    db_breaker, is_connection_error, spool_payload, spool_pending, replay_spool_in_background,
+)
+
+
+def _spool(validated_list) -> bool:
+    # Keep the records locally; they are replayed into the DB once it is reachable again
+    try:
+        for validated_data in validated_list:
+            spool_payload(validated_data)
+        return True
+    except Exception as e:
+        print(f"[DB Spool Error] {e}")
+        return False
+
+
+def _save_to_db(validated_list):
+    """
+    Save validated payloads unless the circuit breaker says the DB is down.
+    Returns (training_ids, db_saved, db_spooled, db_error).
+    """
+    if not db_breaker.allow_request():
+        # Fast-fail: no connection timeout while the DB is known to be down
+        return [], False, _spool(validated_list), "Database unavailable (circuit open)"
+
+    try:
+        trainings = bulk_create_trainings(validated_list)
+    except Exception as e:
+        # Every request resolves the breaker, so a failed half-open probe never leaves it stuck
+        db_breaker.record_result(e)
+        db_spooled = _spool(validated_list) if is_connection_error(e) else False
+        return [], False, db_spooled, str(e)
+
+    db_breaker.record_result()
+    if spool_pending():
+        # Covers spool files of restarted workers and claims left by a crashed replay
+        replay_spool_in_background()
+    return [t.id for t in trainings], True, False, None
 
 
 class SubmitTrainingAPIView(APIView):
     """
     Resilient endpoint:
-    - Try to save in DB (if DB is available)
+    - Try to save in DB (if DB is available); while the DB circuit breaker is open,
+      skip it and spool the validated payload for replay
     - Always try to update/upload Excel to OneDrive
     - If DB is down, system still works using OneDrive as the source of truth
+    Accepts gzip-compressed JSON bodies (Content-Encoding: gzip).
     """
 
+    parser_classes = [GzipJSONParser, FormParser, MultiPartParser]
+
     def post(self, request, *args, **kwargs):
         training_id = None
         db_saved = False
+        db_spooled = False
         db_error = None
 
         # 1) Validate payload structure (serializer validation)
         serializer = TrainingRecordSerializer(data=request.data)
         if serializer.is_valid():
-            # 2) Try saving to DB (may fail if DB is down)
-            try:
-                training = serializer.save()
-                training_id = training.id
-                db_saved = True
-            except Exception as e:
-                db_saved = False
-                db_error = str(e)
+            # 2) Try saving to DB (skipped + spooled while the DB is down)
+            training_ids, db_saved, db_spooled, db_error = _save_to_db([serializer.validated_data])
+            training_id = training_ids[0] if training_ids else None
         else:
             # If invalid, we still attempt Excel save (optional but useful)
             db_error = serializer.errors
@@ -40,6 +80,8 @@ class SubmitTrainingAPIView(APIView):
         excel_saved = False
         excel_error = None
         try:
+            # Lazy: openpyxl/requests load on first use (or at warmup), not at URLconf import
+            from .excel_utils import save_to_excel
             save_to_excel(request.data)  # use raw payload, no DB dependency
             excel_saved = True
         except Exception as e:
@@ -54,6 +96,7 @@ class SubmitTrainingAPIView(APIView):
                 "db_saved": db_saved,
                 "training_id": training_id,
                 "db_error": db_error,
+                "db_spooled": db_spooled,
                 "excel_saved": excel_saved,
                 "excel_error": excel_error,
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -64,11 +107,98 @@ class SubmitTrainingAPIView(APIView):
             "db_saved": db_saved,
             "training_id": training_id,
             "db_error": db_error,
+            "db_spooled": db_spooled,
             "excel_saved": excel_saved,
             "excel_error": excel_error,
         }, status=status.HTTP_201_CREATED)
 
 
+class SubmitTrainingBatchAPIView(APIView):
+    """
+    Batch variant of SubmitTrainingAPIView for low-bandwidth schools:
+    columnar payload (see services/columnar.py), optionally gzip-compressed.
+    Valid records are saved to DB in one bulk insert; all records go to Excel,
+    one workbook save/upload per school.
+    """
+
+    parser_classes = [GzipJSONParser, FormParser, MultiPartParser]
+
+    def post(self, request, *args, **kwargs):
+        from .services.columnar import decode_batch, ColumnarBatchError
+
+        try:
+            raw_records, validated_records, errors = decode_batch(request.data)
+        except ColumnarBatchError as e:
+            return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if not raw_records:
+            return Response({"message": "Empty batch"}, status=status.HTTP_400_BAD_REQUEST)
+
+        training_ids, db_saved, db_spooled, db_error = [], False, False, None
+        if validated_records:
+            training_ids, db_saved, db_spooled, db_error = _save_to_db(validated_records)
+
+        excel_saved = False
+        excel_error = None
+        try:
+            from .excel_utils import save_batch_to_excel
+            save_batch_to_excel(raw_records)
+            excel_saved = True
+        except Exception as e:
+            excel_error = str(e)
+
+        return Response({
+            "message": "Processed successfully" if excel_saved else "Processed, but Excel/OneDrive failed",
+            "records": len(raw_records),
+            "db_saved": db_saved,
+            "db_saved_count": len(training_ids),
+            "training_ids": training_ids,
+            "db_error": db_error,
+            "db_spooled": db_spooled,
+            "validation_errors": errors or None,
+            "excel_saved": excel_saved,
+            "excel_error": excel_error,
+        }, status=status.HTTP_201_CREATED if excel_saved else status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ItemAnalysisAPIView(APIView):
+    """
+    Per-question statistics for a subject/grade (optionally within a date range):
+    GET ?subject=Math&grade=4&date_from=2026-01-01&date_to=2026-06-30&key=Q1:A,Q2:B
+    - key is optional; without it only option frequencies/point-biserials are returned
+    - refresh=1 bypasses the cached result
+    Staff only (Django admin session or basic auth): per-school data, and refresh=1
+    forces a full live + archive scan.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        from .services.item_analysis import run_item_analysis, parse_answer_key, parse_date_range  # numpy, lazy
+
+        params = request.query_params
+        subject = params.get("subject")
+        grade = params.get("grade")
+        if not subject or not grade:
+            return Response({"message": "subject and grade are required"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            answer_key = parse_answer_key(params.get("key"))
+            date_from, date_to = parse_date_range(params.get("date_from"), params.get("date_to"))
+        except ValueError as e:
+            return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        result = run_item_analysis(
+            subject=subject,
+            grade=grade,
+            date_from=date_from,
+            date_to=date_to,
+            answer_key=answer_key,
+            use_cache=params.get("refresh") != "1",
+        )
+        return Response(result, status=status.HTTP_200_OK)
+
+
 def azure_callback(request):
     """
     Dummy endpoint for Azure App Registration.
@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'timss_project.settings')
 
 application = get_wsgi_application()
+
+# Import the lazily-loaded Excel/Graph modules before the first request
+# (with gunicorn preload_app this happens once, in the master).
+from main_app.startup import warm_imports  # noqa: E402
+
+warm_imports()